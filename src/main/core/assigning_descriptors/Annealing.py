@@ -0,0 +1,297 @@
+from typing import List, Callable, Any
+from abc import ABC, abstractmethod
+from math import exp, log
+from random import random
+import argparse
+import time
+
+SCHEDULES = ["exponential", "linear", "adaptive", "greedy", "constant"]
+COOLING_STEPS = 1000000 # Steps to cool over, if not given
+END_RATIO = 0.001 # End temperature as a fraction of the start temperature, if not given
+PHASE_LENGTH = 10000 # Steps in each phase of statistics
+ROUNDING = 1e-12 # Score changes smaller than this are rounding errors, not losses, when estimating temperatures
+START_ACCEPTANCE = 0.02 # Chance of keeping a change which lowers the score at the estimated start temperature
+
+class Schedule(ABC):
+    ''' How the temperature falls over a run. The start temperature may be left to the annealer to estimate, and the
+        end temperature defaults to END_RATIO of the start. advance is called after every step, and end_phase
+        with the statistics of every phase. '''
+
+    def __init__(self, steps: int = COOLING_STEPS, start: float | None = None, end: float | None = None):
+        self.steps: int = max(1, steps)
+        self.start: float | None = start
+        self.end: float | None = end
+        self.current: float = 0.0 if start is None else start
+        self.reheats: int = 0
+
+    def begin(self, start: float, acceptance: float = START_ACCEPTANCE) -> None:
+        ''' Start cooling, from start if no start temperature was given. acceptance is the chance of keeping a
+            worse change the start temperature was chosen for. '''
+        if self.start is None:
+            self.start = start
+        if self.end is None:
+            self.end = self.start * END_RATIO
+        self.current = self.start
+
+    def temperature(self) -> float:
+        return self.current
+
+    @abstractmethod
+    def advance(self, accepted: bool, improved: bool) -> None:
+        ''' Update the temperature after a step, told whether the step was kept and whether it set a new best. '''
+
+    def end_phase(self, phase: "PhaseStats") -> None:
+        pass
+
+class ExponentialSchedule(Schedule):
+    ''' Multiply the temperature by the same factor every step, reaching the end temperature after steps. '''
+
+    def begin(self, start: float, acceptance: float = START_ACCEPTANCE) -> None:
+        super().begin(start, acceptance)
+        self.factor: float = (self.end / self.start) ** (1 / self.steps) if self.start > 0 and self.end > 0 else 0.0
+
+    def advance(self, accepted: bool, improved: bool) -> None:
+        self.current = max(self.end, self.current * self.factor)
+
+class LinearSchedule(Schedule):
+    ''' Lower the temperature by the same amount every step, reaching the end temperature after steps. '''
+
+    def advance(self, accepted: bool, improved: bool) -> None:
+        self.current = max(self.end, self.current - (self.start - self.end) / self.steps)
+
+class AdaptiveSchedule(Schedule):
+    ''' Steer the temperature so that the share of worse changes kept follows a target, which falls exponentially
+        from the start acceptance to END_RATIO of it over steps. After each phase the temperature is scaled by how
+        far the share kept was from the target, so it follows the size of score changes as they shrink. Whenever
+        the best score has not improved for patience steps, the target is raised back to REHEAT of the start
+        acceptance, to climb out of the local optimum the search is stuck in. '''
+
+    REHEAT = 0.5
+    MAX_ADJUSTMENT = 2.0 # Most the temperature is scaled by (up or down) after one phase
+
+    def __init__(self, steps: int = COOLING_STEPS, start: float | None = None, end: float | None = None, patience: int | None = None):
+        super().__init__(steps, start, end)
+        self.patience: int = max(1, self.steps // 20) if patience is None else patience
+        self.acceptance: float = START_ACCEPTANCE
+        self.target: float = START_ACCEPTANCE # Share of worse changes to keep now
+        self._factor: float = END_RATIO ** (1 / self.steps)
+        self._stalled: int = 0
+
+    def begin(self, start: float, acceptance: float = START_ACCEPTANCE) -> None:
+        super().begin(start, acceptance)
+        self.acceptance = self.target = acceptance
+
+    def advance(self, accepted: bool, improved: bool) -> None:
+        self.target = max(self.acceptance * END_RATIO, self.target * self._factor)
+        self._stalled = 0 if improved else self._stalled + 1
+        if self._stalled >= self.patience:
+            self.target = max(self.target, self.acceptance * self.REHEAT)
+            self._stalled = 0
+            self.reheats += 1
+
+    def end_phase(self, phase: "PhaseStats") -> None:
+        if not phase.losses or self.current <= 0:
+            return
+        # A loss l is kept with chance exp(-l / T), so T must scale by log(kept) / log(target) to keep the target
+        kept = (phase.worse + 1) / (phase.losses + 2)
+        adjustment = log(kept) / log(self.target)
+        self.current *= min(self.MAX_ADJUSTMENT, max(1 / self.MAX_ADJUSTMENT, adjustment))
+
+class GreedySchedule(Schedule):
+    ''' Never accept a worse score. '''
+
+    def __init__(self, steps: int = COOLING_STEPS, start: float | None = None, end: float | None = None):
+        super().__init__(steps, 0.0, 0.0)
+
+    def begin(self, start: float, acceptance: float = START_ACCEPTANCE) -> None:
+        self.start = self.end = self.current = 0.0
+
+    def advance(self, accepted: bool, improved: bool) -> None:
+        pass
+
+class ConstantSchedule(Schedule):
+    ''' Keep the same temperature, as the replicas of parallel tempering do between swaps. '''
+
+    def __init__(self, steps: int = COOLING_STEPS, start: float | None = None, end: float | None = None):
+        super().__init__(steps, start, start)
+
+    def advance(self, accepted: bool, improved: bool) -> None:
+        pass
+
+def make_schedule(name: str, steps: int = COOLING_STEPS, start: float | None = None, end: float | None = None) -> Schedule:
+    ''' Make a cooling schedule by its name in SCHEDULES. '''
+    if name == "exponential":
+        return ExponentialSchedule(steps, start, end)
+    if name == "linear":
+        return LinearSchedule(steps, start, end)
+    if name == "adaptive":
+        return AdaptiveSchedule(steps, start, end)
+    if name == "greedy":
+        return GreedySchedule(steps, start, end)
+    if name == "constant":
+        return ConstantSchedule(steps, start, end)
+    raise ValueError(f"Unknown schedule: {name}")
+
+class PhaseStats:
+    ''' What happened over one phase of a run. '''
+
+    def __init__(self, number: int, first_step: int, temperature: float, score: float):
+        self.number: int = number
+        self.first_step: int = first_step
+        self.steps: int = 0
+        self.accepted: int = 0 # Changes kept, of any score
+        self.worse: int = 0 # Changes kept which lowered the score
+        self.improved: int = 0 # Changes which gave a new best score
+        self.losses: int = 0 # Changes tried which lowered the score, kept or not
+        self.start_temperature: float = temperature
+        self.end_temperature: float = temperature
+        self.start_score: float = score
+        self.end_score: float = score
+        self.best_score: float = score
+        self.seconds: float = 0.0
+
+    def acceptance(self) -> float:
+        return self.accepted / self.steps if self.steps else 0.0
+
+    def __str__(self) -> str:
+        rate = self.steps / self.seconds if self.seconds else 0.0
+        return f"Phase {self.number} (steps {self.first_step}-{self.first_step + self.steps - 1}): " \
+               f"score {self.start_score:.6f} -> {self.end_score:.6f}, best {self.best_score:.6f}, " \
+               f"T {self.start_temperature:.3g} -> {self.end_temperature:.3g}, " \
+               f"accepted {self.acceptance():.1%} ({self.worse} of {self.losses} worse), {self.improved} new best, {rate:.0f} steps/s"
+
+class Annealer:
+    ''' Simulated annealing: make a random change, and keep it if it raises the score, or by the Metropolis rule
+        (with probability exp(delta / temperature)) if it lowers it, with the temperature set by a schedule.
+        permute makes a random change and returns something with undo(), or None if it made no change, and score
+        gives the current score. With no start temperature, one is estimated so that about start_acceptance of
+        the changes which lower the score are kept at first; until a change which lowers the score is seen (as when nothing is
+        assigned yet), the search is greedy and the estimate is tried again every phase. Statistics are kept for
+        every phase of phase_length steps. '''
+
+    def __init__(self, permute: Callable[[], Any], score: Callable[[], float], schedule: Schedule, phase_length: int = PHASE_LENGTH, start_acceptance: float = START_ACCEPTANCE, report: Callable[[str], None] | None = print):
+        self.permute: Callable[[], Any] = permute
+        self.score: Callable[[], float] = score
+        self.schedule: Schedule = schedule
+        self.phase_length: int = phase_length
+        self.start_acceptance: float = start_acceptance
+        self.report: Callable[[str], None] | None = report
+        self.phases: List[PhaseStats] = []
+        self.steps: int = 0
+        self.current: float = 0.0
+        self.best: float = 0.0
+        self._started: bool = False
+        self._cooling: bool = False
+
+    def estimate_temperature(self, acceptance: float, samples: int = 200) -> float:
+        ''' A temperature at which changes which lower the score are kept with about the given probability, from
+            the losses of sample changes. Every sample change is undone. '''
+        current = self.score()
+        losses: List[float] = []
+        for _ in range(samples):
+            change = self.permute()
+            if change is None:
+                continue
+            delta = self.score() - current
+            change.undo()
+            if delta < -ROUNDING:
+                losses.append(-delta)
+        if not losses:
+            return 0.0
+        # The chance of keeping a loss rises with the temperature: search for the one giving acceptance
+        low, high = 0.0, max(losses) / -log(min(acceptance, 0.999))
+        for _ in range(100):
+            middle = (low + high) / 2
+            if sum(exp(-loss / middle) for loss in losses) / len(losses) < acceptance:
+                low = middle
+            else:
+                high = middle
+        return high
+
+    def _start(self) -> None:
+        self.current = self.best = self.score()
+        self._started = True
+
+    def _begin_cooling(self) -> None:
+        start = self.estimate_temperature(self.start_acceptance) if self.schedule.start is None else self.schedule.start
+        if start > 0 or self.schedule.start is not None:
+            self.schedule.begin(start, self.start_acceptance)
+            self._cooling = True
+
+    def step(self) -> bool:
+        ''' Make one change and keep or undo it. Returns whether it was kept. '''
+        temperature = self.schedule.temperature()
+        change = self.permute()
+        if change is None:
+            accepted, delta = False, 0.0
+        else:
+            new_score = self.score()
+            delta = new_score - self.current
+            accepted = delta >= 0 or (temperature > 0 and random() < exp(delta / temperature))
+            if accepted:
+                self.current = new_score
+            else:
+                change.undo()
+        improved = accepted and self.current > self.best
+        if improved:
+            self.best = self.current
+        if self._cooling:
+            self.schedule.advance(accepted, improved)
+        phase = self.phases[-1]
+        phase.steps += 1
+        phase.accepted += accepted
+        phase.worse += accepted and delta < 0
+        phase.improved += improved
+        phase.losses += delta < 0
+        self.steps += 1
+        return accepted
+
+    def _begin_phase(self) -> None:
+        if not self._cooling:
+            self._begin_cooling()
+        self.phases.append(PhaseStats(len(self.phases) + 1, self.steps, self.schedule.temperature(), self.current))
+
+    def _end_phase(self, started: float) -> None:
+        phase = self.phases[-1]
+        phase.end_temperature = self.schedule.temperature()
+        phase.end_score = self.current
+        phase.best_score = self.best
+        phase.seconds = time.perf_counter() - started
+        if self._cooling:
+            self.schedule.end_phase(phase)
+        if self.report is not None:
+            self.report(str(phase))
+
+    def run(self, steps: int | None = None, seconds: float | None = None) -> float:
+        ''' Anneal for a number of steps, a number of seconds, or (with neither) until interrupted. Can be called
+            again to continue. Returns the best score reached. '''
+        if not self._started:
+            self._start()
+        last = None if steps is None else self.steps + steps
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        while (last is None or self.steps < last) and (deadline is None or time.perf_counter() < deadline):
+            self._begin_phase()
+            started = time.perf_counter()
+            try:
+                for _ in range(self.phase_length):
+                    if (last is not None and self.steps >= last) or (deadline is not None and time.perf_counter() >= deadline):
+                        break
+                    self.step()
+            finally:
+                self._end_phase(started)
+        return self.best
+
+def add_schedule_arguments(parser: argparse.ArgumentParser) -> None:
+    ''' Add the arguments which choose an annealing schedule and budget to a command line parser. '''
+    parser.add_argument("--schedule", choices=SCHEDULES, default="adaptive", help="how the temperature falls (default: adaptive)")
+    parser.add_argument("--steps", type=int, help=f"stop after this many steps, cooling over them (default: cool over {COOLING_STEPS} and run until interrupted)")
+    parser.add_argument("--seconds", type=float, help="stop after this many seconds")
+    parser.add_argument("--start-temperature", type=float, help="temperature to start at (default: estimated from the score changes)")
+    parser.add_argument("--start-acceptance", type=float, default=START_ACCEPTANCE, help=f"chance of keeping a worse change at the estimated start temperature (default: {START_ACCEPTANCE})")
+    parser.add_argument("--end-temperature", type=float, help=f"temperature to cool to (default: {END_RATIO} of the start)")
+    parser.add_argument("--phase-length", type=int, default=PHASE_LENGTH, help=f"steps in each phase of statistics (default: {PHASE_LENGTH})")
+
+def annealer_from_arguments(args: argparse.Namespace, permute: Callable[[], Any], score: Callable[[], float]) -> Annealer:
+    ''' Make the annealer chosen by arguments added with add_schedule_arguments. '''
+    schedule = make_schedule(args.schedule, args.steps or COOLING_STEPS, args.start_temperature, args.end_temperature)
+    return Annealer(permute, score, schedule, args.phase_length, args.start_acceptance)
@@ -0,0 +1,95 @@
+from typing import List, Dict, Tuple, Any
+from multiprocessing import Pool
+import argparse
+import os
+import random
+import signal
+import time
+
+import Test
+from Dataset import Dataset, add_arguments, from_arguments
+from CountyData import get_county_data
+from Annealing import Annealer, SCHEDULES, COOLING_STEPS, make_schedule
+
+WORKERS = os.cpu_count() or 1 # Runs at once, if not given: one per core
+BATCH_LOG = "logs\\batch.out"
+
+def run_once(dataset: Dataset, seed: int, schedule: str, steps: int | None, seconds: float | None) -> Dict[str, Any]:
+    ''' Run the optimizer once from the start, with its own seed, and return its result (see Test.result) with the
+        seed, the best score reached, the steps taken and the time taken. Run in a fresh process: the optimizer's
+        counties and descriptors are module globals. '''
+    started = time.perf_counter()
+    random.seed(seed)
+    Test.read_counties(dataset)
+    Test.initialize()
+    annealer = Annealer(Test.permute, Test.score, make_schedule(schedule, steps or COOLING_STEPS), report=None)
+    best = Test.run(annealer, steps, seconds)
+    return Test.result() | {"seed": seed, "best": best, "steps": annealer.steps, "seconds": time.perf_counter() - started}
+
+def _ignore_interrupt() -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Interrupting the batch stops the pool, which keeps the finished runs
+
+def _run_once(args: Tuple[Dataset, int, str, int | None, float | None]) -> Dict[str, Any]:
+    return run_once(*args)
+
+def describe(result: Dict[str, Any]) -> str:
+    return f"Seed {result['seed']}: score {result['score']:.6f} (best {result['best']:.6f}) after {result['steps']} steps in {result['seconds']:.0f}s"
+
+def run_batch(dataset: Dataset, runs: int, schedule: str = "adaptive", steps: int | None = None, seconds: float | None = None, seed: int | None = None, workers: int = WORKERS) -> List[Dict[str, Any]]:
+    ''' Run the optimizer runs times, each with seed, seed + 1, ..., across a pool of workers, and return the
+        results of the runs which finished, best first. Each run stops after steps or seconds (at least one must be
+        given). If interrupted, the runs which already finished are still returned. '''
+    if steps is None and seconds is None:
+        raise ValueError("Give each run a budget of steps or seconds")
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    # Every run must choose the same sample of counties, so their scores can be compared
+    if dataset.sample is not None and dataset.seed is None:
+        dataset.seed = seed
+    get_county_data() # Build the county data once, before the runs read it
+    results: List[Dict[str, Any]] = []
+    # One run per process, so no run starts from another's descriptors
+    pool = Pool(processes=min(workers, runs), initializer=_ignore_interrupt, maxtasksperchild=1)
+    try:
+        for result in pool.imap_unordered(_run_once, [(dataset, seed + i, schedule, steps, seconds) for i in range(runs)]):
+            results.append(result)
+            print(describe(result))
+        pool.close()
+    except KeyboardInterrupt:
+        print(f"Interrupted: keeping the {len(results)} finished runs")
+        pool.terminate()
+    pool.join()
+    return sorted(results, key=lambda result: result["score"], reverse=True)
+
+def write_batch(results: List[Dict[str, Any]], path: str = BATCH_LOG) -> None:
+    ''' Write a line for every run, best first, and the mean and spread of their scores. '''
+    scores = [result["score"] for result in results]
+    mean = sum(scores) / len(scores)
+    spread = (sum((score - mean) ** 2 for score in scores) / len(scores)) ** 0.5
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as out:
+        for result in results:
+            out.write(describe(result) + "\n")
+        out.write(f"{len(results)} runs: mean score {mean:.6f}, standard deviation {spread:.6f}, best {scores[0]:.6f} (seed {results[0]['seed']})\n")
+
+def main(dataset: Dataset | None = None, runs: int = WORKERS, schedule: str = "adaptive", steps: int | None = None, seconds: float | None = None, seed: int | None = None, workers: int = WORKERS) -> None:
+    results = run_batch(Dataset() if dataset is None else dataset, runs, schedule, steps, seconds, seed, workers)
+    if not results:
+        print("No runs finished")
+        return
+    write_batch(results)
+    Test.write_output(results[0])
+    print(f"Best: {describe(results[0])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assign descriptors to counties in many independent runs, keeping the best")
+    add_arguments(parser)
+    parser.add_argument("--runs", type=int, default=WORKERS, help=f"runs to make (default: {WORKERS})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"runs at once, each in its own process (default: {WORKERS}, one per core)")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="adaptive", help="how each run's temperature falls (default: adaptive)")
+    parser.add_argument("--steps", type=int, help="stop each run after this many steps")
+    parser.add_argument("--seconds", type=float, help="stop each run after this many seconds")
+    parser.add_argument("--run-seed", type=int, help="seed of the first run; the others follow it")
+    args = parser.parse_args()
+    if args.steps is None and args.seconds is None:
+        parser.error("give each run a budget with --steps or --seconds")
+    main(from_arguments(args), args.runs, args.schedule, args.steps, args.seconds, args.run_seed, args.workers)
@@ -1,18 +1,18 @@
-from typing import List, Dict, Any
-import json
-import os
+from typing import List, Dict, Mapping
+from itertools import count
 
 from Descriptor import Descriptor
-from Descriptor import demographics as demos
+from Descriptor import add_demographics
+from Dataset import Dataset
 
 class County:
-    def __init__(self, name: str, state: str, population: int, demographics: Dict[str, float], descriptors: List[Descriptor]):
+    def __init__(self, name: str, state: str, population: int, demographics: Mapping[str, float], descriptors: List[Descriptor]):
+        self.id: int = next(_ids) # Unique ID, for cheap hashing and equality
         self.name: str = name
         self.state: str = state
         self.population: int = population
-        self.demographics: Dict[str, float] = demographics
-        for d in [_ for _ in self.demographics if _ not in demos]:
-            demos.append(d)
+        self.demographics: Mapping[str, float] = demographics
+        add_demographics(*self.demographics)
         self.descriptors: List[Descriptor] = descriptors
         self.recalculate = True
         self._desc_demos: Dict[str, float] | None = None
@@ -32,31 +32,21 @@ class County:
         return f"{self.name}, {self.state}: {self.population=} {self.demographics=} descriptors={[d.name for d in self.descriptors]}"
     
     def __hash__(self) -> int:
-        return hash(self.name) + hash(self.state) + hash(self.population)
-    
-counties: List[County] = []
-def read_counties():
-    global counties
-    counties = []
-    for state in [s for s in os.listdir(f"src\\main\\resources") if '.' not in s]:
-        for county in [c for c in os.listdir(f"src\\main\\resources\\{state}\\counties") if '.' in c]:
-            with open(f"src\\main\\resources\\{state}\\counties\\{county}", 'r') as data:
-                j: Dict[str, Any] = json.loads(data.read())
-                counties.append(County(j['name'], state.replace('_',' ').title(), j['population'], flatten_dict(j['demographics']), []))
+        return self.id
 
-def flatten_dict(d: Dict[str, Any], parent_key: str = "", sep: str = "->", result: Dict[str, Any] | None = None) -> Dict[str, float]:
-    if result is None:
-        result = {}
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            flatten_dict(v, new_key, sep, result)
-        elif isinstance(v, float):
-            result[new_key] = v
-        else:
-            raise TypeError(f"Unsupported type for key {new_key}: {type(v)}")
-    return result
+    def __eq__(self, other) -> bool:
+        return type(self) == type(other) and self.id == other.id
+    
+_ids = count()
 
-# On Import
-read_counties()
-print("Counties made successfully")
\ No newline at end of file
+counties: List[County] = []
+def read_counties(dataset: Dataset | None = None) -> List[County]:
+    ''' Read the counties in the dataset (every county by default) into counties. The list is filled in place,
+        so modules which imported it see the counties. '''
+    dataset = Dataset() if dataset is None else dataset
+    counties.clear()
+    data = dataset.data
+    for row in dataset.rows:
+        counties.append(County(str(data.names[row]), str(data.states[row]).replace('_',' ').title(), int(data.population[row]), data.demographics_row(row), []))
+    print(f"{len(counties)} counties made successfully")
+    return counties
@@ -0,0 +1,100 @@
+from typing import List, Dict, Tuple, Any
+import importlib.util
+import json
+import os
+
+# The FIPS gazetteer lives with the data gathering code
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "gathering_data", "gazetteer.py")
+
+_gazetteer: Any = None
+def get_gazetteer() -> Any:
+    ''' Get the gazetteer of the data gathering code, loaded on first use from its file. Its folder is not added to
+        sys.path: it has modules named like this folder's (Main, County), which would shadow or be shadowed. '''
+    global _gazetteer
+    if _gazetteer is None:
+        spec = importlib.util.spec_from_file_location("gazetteer", GAZETTEER_FILE)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _gazetteer = module.get_gazetteer()
+    return _gazetteer
+
+class CountyCatalog:
+    ''' Every county in the resources, keyed by FIPS code and read exactly once. A county may have two json files,
+        one named by the county and one named by its FIPS code: the FIPS-named file is kept, the other is recorded
+        as a duplicate, and any disagreement between the files is recorded as a conflict. County-named files are
+        looked up in gazetteer (the data gathering code's, by default). '''
+
+    def __init__(self, gazetteer: Any = None):
+        self.gazetteer: Any = get_gazetteer() if gazetteer is None else gazetteer
+        self.records: Dict[str, Dict[str, Any]] = {} # FIPS -> county json, with "folder": the state folder name
+        self.paths: Dict[str, str] = {} # FIPS -> path of the file kept
+        self.duplicates: Dict[str, List[str]] = {} # FIPS -> paths of the files skipped
+        self.conflicts: List[str] = []
+        self.unidentified: List[str] = [] # paths of files with no FIPS code
+        self._named: Dict[str, str] = {} # FIPS -> path of the county-named file
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, path: str, folder: str, record: Dict[str, Any]) -> None:
+        ''' Add a county's json, read from path in a state folder. '''
+        stem = os.path.basename(path).rsplit('.', 1)[0]
+        # A FIPS-named file is keyed by its name, any other by looking the county up
+        if stem.isdigit():
+            fips = stem
+        else:
+            fips = self.gazetteer.county_fips(stem, folder) or record.get('FIPS')
+        if not fips:
+            self.unidentified.append(path)
+            return
+        # Two county-named files with one FIPS code are two counties read as one, not a duplicate
+        if not stem.isdigit():
+            if fips in self._named:
+                raise ValueError(f"{self._named[fips]} and {path} are both county {fips}")
+            self._named[fips] = path
+        if record.get('FIPS') and record['FIPS'] != fips:
+            self.conflicts.append(f"{path} records FIPS {record['FIPS']}, but is county {fips}")
+        record = record | {"folder": folder}
+        if fips not in self.records:
+            self.records[fips] = record
+            self.paths[fips] = path
+            return
+        # Keep the FIPS-named file, and skip the other
+        if stem.isdigit():
+            skipped, other = self.paths[fips], self.records[fips]
+            self.records[fips] = record
+            self.paths[fips] = path
+        else:
+            skipped, other = path, record
+        self.duplicates.setdefault(fips, []).append(skipped)
+        for field in ["name", "population", "demographics"]:
+            if self.records[fips].get(field) != other.get(field):
+                self.conflicts.append(f"{self.paths[fips]} and {skipped} differ in {field}")
+
+    def fips_codes(self) -> List[str]:
+        ''' Get the FIPS code of every county, in order. '''
+        return sorted(self.records)
+
+    def report(self) -> None:
+        ''' Print the number of counties, duplicate files skipped, and every conflict. '''
+        print(f"{len(self.records)} counties, {sum(len(d) for d in self.duplicates.values())} duplicate files skipped")
+        for path in self.unidentified:
+            print(f"No FIPS code for {path}, skipped")
+        for conflict in self.conflicts:
+            print(f"Conflict: {conflict}")
+
+def county_files(resources_dir: str) -> List[Tuple[str, str]]:
+    ''' Get the (state folder, path) of every county json file in resources_dir, in order. '''
+    files: List[Tuple[str, str]] = []
+    for folder in sorted(s for s in os.listdir(resources_dir) if '.' not in s):
+        for county in sorted(c for c in os.listdir(f"{resources_dir}\\{folder}\\counties") if c.endswith(".json")):
+            files.append((folder, f"{resources_dir}\\{folder}\\counties\\{county}"))
+    return files
+
+def read_catalog(resources_dir: str) -> CountyCatalog:
+    ''' Read every county json file in resources_dir into a catalog. '''
+    catalog = CountyCatalog()
+    for folder, path in county_files(resources_dir):
+        with open(path, 'r', encoding='utf-8') as data:
+            catalog.add(path, folder, json.loads(data.read()))
+    return catalog
@@ -0,0 +1,165 @@
+from typing import List, Dict, Any, Iterator
+from collections.abc import Mapping
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+from CountyCatalog import read_catalog, county_files
+
+RESOURCES_DIR = "src\\main\\resources"
+# Compiled county data. The names contain a '.', so loops over the state folders in RESOURCES_DIR skip them
+MATRIX_FILE = RESOURCES_DIR + "\\counties.npy" # counties x demographics float matrix, memory-mapped when loaded
+INDEX_FILE = RESOURCES_DIR + "\\counties.npz" # FIPS, names, states, populations, demographic column names and the sources' fingerprint
+OBSERVED_FILE = RESOURCES_DIR + "\\counties.observed.npy" # The same matrix with missing values 0, memory-mapped for the scoring engine
+
+class CountyData:
+    ''' Every county's data in columns: one array each of FIPS codes, names, states (folder names) and populations,
+        and a counties x demographics matrix of the flattened demographics, with NaN where a county has no value
+        for a demographic. Row i of every column is the same county. The observed matrix is the demographics matrix
+        with 0 where it has NaN, as the scoring engine compares predictions against. '''
+
+    def __init__(self, fips: np.ndarray, names: np.ndarray, states: np.ndarray, population: np.ndarray, columns: List[str], demographics: np.ndarray, observed: np.ndarray | None = None):
+        self.fips: np.ndarray = fips
+        self.names: np.ndarray = names
+        self.states: np.ndarray = states
+        self.population: np.ndarray = population
+        self.columns: List[str] = columns
+        self.column_index: Dict[str, int] = {column: i for i, column in enumerate(columns)}
+        self.demographics: np.ndarray = demographics
+        self.observed: np.ndarray = np.nan_to_num(demographics, nan=0.0) if observed is None else observed
+
+    def __len__(self) -> int:
+        return len(self.fips)
+
+    def demographics_dict(self, row: int) -> Dict[str, float]:
+        ''' Get the flattened demographics of the county in a row, as read from its json file. '''
+        return {column: value for column, value in zip(self.columns, self.demographics[row].tolist()) if value == value} # NaN != NaN
+
+    def demographics_row(self, row: int) -> "DemographicsRow":
+        ''' Get the flattened demographics of the county in a row, read from the matrix whenever used. '''
+        return DemographicsRow(self, row)
+
+class DemographicsRow(Mapping):
+    ''' A county's flattened demographics as a read-only dictionary, read from its row of the county data whenever
+        used instead of copied out, so processes sharing memory-mapped county data do not each hold a copy.
+        Demographics the county has no value for are not keys. '''
+
+    def __init__(self, data: CountyData, row: int):
+        self.data: CountyData = data
+        self.row: int = row
+
+    def __getitem__(self, demographic: str) -> float:
+        value = float(self.data.demographics[self.row, self.data.column_index[demographic]])
+        if value != value: # NaN != NaN
+            raise KeyError(demographic)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.data.columns[column] for column in np.flatnonzero(~np.isnan(self.data.demographics[self.row])))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.data.demographics[self.row])))
+
+    def items(self):
+        return self.data.demographics_dict(self.row).items()
+
+    def __repr__(self) -> str:
+        return repr(self.data.demographics_dict(self.row))
+
+def flatten_dict(d: Dict[str, Any], parent_key: str = "", sep: str = "->", result: Dict[str, Any] | None = None) -> Dict[str, float]:
+    if result is None:
+        result = {}
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            flatten_dict(v, new_key, sep, result)
+        elif isinstance(v, float):
+            result[new_key] = v
+        else:
+            raise TypeError(f"Unsupported type for key {new_key}: {type(v)}")
+    return result
+
+def sources_fingerprint(resources_dir: str = RESOURCES_DIR) -> str:
+    ''' Fingerprint of the county json files: their paths, sizes and modification times. Changes whenever a file
+        is added, removed, renamed or rewritten. '''
+    digest = hashlib.sha256()
+    for _, path in county_files(resources_dir):
+        stat = os.stat(path)
+        digest.update(f"{path}\t{stat.st_size}\t{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def build_county_data(resources_dir: str = RESOURCES_DIR, matrix_file: str = MATRIX_FILE, index_file: str = INDEX_FILE, observed_file: str = OBSERVED_FILE) -> CountyData:
+    ''' Compile every county in resources_dir, once each, into the columnar files, recording the json files' fingerprint. '''
+    fips: List[str] = []
+    names: List[str] = []
+    states: List[str] = []
+    population: List[int] = []
+    rows: List[Dict[str, float]] = []
+    sources = sources_fingerprint(resources_dir) # Taken first, so files changed while building are seen as changed
+    catalog = read_catalog(resources_dir)
+    catalog.report()
+    for code in catalog.fips_codes():
+        j: Dict[str, Any] = catalog.records[code]
+        fips.append(code)
+        names.append(j['name'])
+        states.append(j['folder'])
+        population.append(j['population'])
+        rows.append(flatten_dict(j['demographics']))
+    columns: List[str] = list(dict.fromkeys(column for row in rows for column in row)) # In order of first appearance
+    column_index = {column: i for i, column in enumerate(columns)}
+    demographics = np.full((len(rows), len(columns)), np.nan)
+    for i, row in enumerate(rows):
+        for column, value in row.items():
+            demographics[i, column_index[column]] = value
+    data = CountyData(np.array(fips), np.array(names), np.array(states), np.array(population, dtype=np.int64), columns, demographics)
+    # Write beside the destination and rename, so a loader never sees half a file
+    with open(matrix_file + ".part", 'wb') as out:
+        np.save(out, demographics)
+    with open(observed_file + ".part", 'wb') as out:
+        np.save(out, data.observed)
+    with open(index_file + ".part", 'wb') as out:
+        np.savez(out, fips=np.array(fips), names=np.array(names), states=np.array(states), population=np.array(population, dtype=np.int64), columns=np.array(columns), sources=np.array(sources))
+    os.replace(matrix_file + ".part", matrix_file)
+    os.replace(observed_file + ".part", observed_file)
+    os.replace(index_file + ".part", index_file)
+    return data
+
+def load_county_data(matrix_file: str = MATRIX_FILE, index_file: str = INDEX_FILE, observed_file: str = OBSERVED_FILE, mmap: bool = True) -> CountyData:
+    ''' Load the columnar files, with the matrices memory-mapped (read only) unless mmap is False. '''
+    with np.load(index_file) as index:
+        fips, names, states, population, columns = index['fips'], index['names'], index['states'], index['population'], [str(c) for c in index['columns']]
+    demographics = np.load(matrix_file, mmap_mode='r' if mmap else None)
+    observed = np.load(observed_file, mmap_mode='r' if mmap else None)
+    return CountyData(fips, names, states, population, columns, demographics, observed)
+
+def stored_fingerprint(index_file: str = INDEX_FILE) -> str | None:
+    ''' The fingerprint of the county json files the columnar files were built from, or None if not recorded. '''
+    with np.load(index_file) as index:
+        return str(index['sources']) if 'sources' in index.files else None
+
+def get_county_data(resources_dir: str = RESOURCES_DIR, matrix_file: str = MATRIX_FILE, index_file: str = INDEX_FILE, observed_file: str = OBSERVED_FILE) -> CountyData:
+    ''' Load the columnar files, building them first if they do not exist yet or the county json files have
+        changed since they were built. '''
+    if not (os.path.exists(matrix_file) and os.path.exists(index_file) and os.path.exists(observed_file)):
+        print("Compiling county data...")
+        build_county_data(resources_dir, matrix_file, index_file, observed_file)
+    elif stored_fingerprint(index_file) != sources_fingerprint(resources_dir):
+        print("County json files changed, recompiling county data...")
+        build_county_data(resources_dir, matrix_file, index_file, observed_file)
+    return load_county_data(matrix_file, index_file, observed_file)
+
+def main() -> None:
+    ''' Rebuild the columnar files: python src/main/core/assigning_descriptors/CountyData.py [resources directory] '''
+    resources_dir = sys.argv[1] if len(sys.argv) > 1 else RESOURCES_DIR
+    start = time.perf_counter()
+    data = build_county_data(resources_dir)
+    print(f"Compiled {len(data)} counties x {len(data.columns)} demographics in {time.perf_counter() - start:.2f} s")
+    start = time.perf_counter()
+    load_county_data()
+    print(f"Loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
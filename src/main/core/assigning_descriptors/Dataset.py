@@ -0,0 +1,102 @@
+from typing import List, Set
+import argparse
+
+import numpy as np
+
+from CountyData import CountyData, get_county_data
+
+def folder_name(state: str) -> str:
+    ''' Get the resources folder name of a state from its name or folder name. '''
+    return state.strip().lower().replace(" ", "_")
+
+class Dataset:
+    ''' The counties an optimizer runs on: every county, or only those in a subset of states, with a subset of FIPS
+        codes, or in a random sample stratified by state (taken from the counties the other filters select).
+        Nothing is read until the counties are first used, and then only the rows of the selected counties are read
+        from the memory-mapped county data. Scores are averaged over the selected counties, the same as over
+        the nation. '''
+
+    def __init__(self, states: List[str] | None = None, fips: List[str] | None = None, sample: int | None = None, seed: int | None = None):
+        self.states: List[str] | None = None if states is None else [folder_name(state) for state in states]
+        self.fips: List[str] | None = None if fips is None else [code.strip().zfill(5) for code in fips]
+        self.sample: int | None = sample
+        self.seed: int | None = seed
+        self._data: CountyData | None = None
+        self._rows: np.ndarray | None = None
+        self._folders: Set[str] | None = None
+
+    @property
+    def data(self) -> CountyData:
+        ''' The county data of every county, loaded on first use. '''
+        if self._data is None:
+            self._data = get_county_data()
+        return self._data
+
+    @property
+    def rows(self) -> np.ndarray:
+        ''' Rows of the county data which are in the dataset, in order. '''
+        if self._rows is None:
+            rows = np.arange(len(self.data))
+            if self.states is not None:
+                rows = rows[np.isin(self.data.states[rows], self.states)]
+            if self.fips is not None:
+                rows = rows[np.isin(self.data.fips[rows], self.fips)]
+            if self.sample is not None and self.sample < len(rows):
+                rows = self._stratified_sample(rows, self.sample)
+            self._rows = rows
+        return self._rows
+
+    def _stratified_sample(self, rows: np.ndarray, size: int) -> np.ndarray:
+        ''' Choose size of the rows at random, taking from each state in proportion to its number of counties. '''
+        rng = np.random.default_rng(self.seed)
+        row_states = self.data.states[rows]
+        folders, counts = np.unique(row_states, return_counts=True)
+        quotas = counts * size / len(rows)
+        allocation = np.floor(quotas).astype(int)
+        # Give the counties left over to the states with the largest remainders
+        allocation[np.argsort(allocation - quotas)[:size - allocation.sum()]] += 1
+        chosen = [rng.choice(rows[row_states == folder], size=k, replace=False) for folder, k in zip(folders, allocation) if k]
+        return np.sort(np.concatenate(chosen))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getstate__(self) -> dict:
+        # Send only the filters to other processes: each maps the county data itself, sharing its pages
+        return self.__dict__ | {"_data": None, "_rows": None, "_folders": None}
+
+    def is_whole_nation(self) -> bool:
+        return self.states is None and self.fips is None and self.sample is None
+
+    def includes_state(self, state: str) -> bool:
+        ''' Whether any counties of the state, by name or folder name, are in the dataset. '''
+        if self.is_whole_nation():
+            return True
+        if self.fips is None and self.sample is None:
+            return folder_name(state) in self.states
+        if self._folders is None:
+            self._folders = set(self.data.states[self.rows].tolist())
+        return folder_name(state) in self._folders
+
+    def __str__(self) -> str:
+        if self.is_whole_nation():
+            return "all states"
+        parts: List[str] = []
+        if self.states is not None:
+            parts.append(", ".join(self.states))
+        if self.fips is not None:
+            parts.append(f"{len(self.fips)} FIPS codes")
+        if self.sample is not None:
+            parts.append(f"sample of {self.sample}" + ("" if self.seed is None else f" (seed {self.seed})"))
+        return "; ".join(parts)
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    ''' Add the arguments which choose a dataset to a command line parser. '''
+    parser.add_argument("--states", nargs="+", help="only use the counties in these states (names or folder names)")
+    parser.add_argument("--fips", nargs="+", help="only use the counties with these FIPS codes")
+    parser.add_argument("--sample", type=int, help="use a random sample of this many counties, stratified by state")
+    parser.add_argument("--seed", type=int, help="seed for the random sample")
+
+def from_arguments(args: argparse.Namespace) -> Dataset:
+    ''' Make the dataset chosen by arguments added with add_arguments. '''
+    return Dataset(args.states, args.fips, args.sample, args.seed)
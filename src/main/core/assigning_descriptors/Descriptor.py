@@ -1,4 +1,8 @@
-from typing import Dict, List, Set
+from typing import Dict, List, Iterator
+from random import choice
+from collections.abc import MutableMapping
+
+import numpy as np
 
 # from Demographic import Demographic
 
@@ -18,44 +22,210 @@ Any given county is likely to have many more descriptors than this.
 
 DESCRIPTORS_MAX = 1000
 
+class Demographics:
+    ''' Every demographic, in the order they were first seen, each with the column of its effects in the effects
+        matrix. Iterates, indexes and tests membership like the list of names it replaces. '''
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def add(self, *names: str) -> None:
+        for name in names:
+            if name not in self.index:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+        effect_table.fit_columns(len(self.names))
+
+    def column(self, name: str) -> int:
+        return self.index[name]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.index
+
+    def __getitem__(self, column: int) -> str:
+        return self.names[column]
+
+class EffectTable:
+    ''' The effects of every descriptor on every demographic, in one contiguous matrix: a row per descriptor and a
+        column per demographic. Storage grows by doubling as descriptors and demographics are added, so a view
+        from matrix() stops following the table once either grows: take views after making every descriptor. '''
+
+    def __init__(self):
+        self._data: np.ndarray = np.zeros((64, 64))
+        self.rows: int = 0
+
+    def add_row(self) -> int:
+        if self.rows == self._data.shape[0]:
+            self._resize(self.rows * 2, self._data.shape[1])
+        self.rows += 1
+        return self.rows - 1
+
+    def fit_columns(self, columns: int) -> None:
+        if columns > self._data.shape[1]:
+            self._resize(self._data.shape[0], max(columns, self._data.shape[1] * 2))
+
+    def _resize(self, rows: int, columns: int) -> None:
+        data = np.zeros((rows, columns))
+        data[:self._data.shape[0], :self._data.shape[1]] = self._data
+        self._data = data
+
+    def matrix(self) -> np.ndarray:
+        ''' View of the effects of every descriptor (rows) on every demographic (columns). '''
+        return self._data[:self.rows, :len(demographics)]
+
+    def row(self, row: int) -> np.ndarray:
+        ''' View of one descriptor's effects on every demographic. '''
+        return self._data[row, :len(demographics)]
+
+    def get(self, row: int, column: int) -> float:
+        return float(self._data[row, column])
+
+    def set(self, row: int, column: int, value: float) -> None:
+        self._data[row, column] = value
+
+class Effects(MutableMapping):
+    ''' A descriptor's effects as a dictionary of demographic to effect, read from and written to the descriptor's
+        row of the effect table. Every demographic is a key: effects default to 0.0, and deleting one sets it back
+        to 0.0. Setting the effect on a new demographic adds the demographic. '''
+
+    def __init__(self, row: int):
+        self.row: int = row
+
+    def __getitem__(self, demographic: str) -> float:
+        return effect_table.get(self.row, demographics.index[demographic])
+
+    def __setitem__(self, demographic: str, value: float) -> None:
+        if demographic not in demographics:
+            demographics.add(demographic)
+        effect_table.set(self.row, demographics.index[demographic], value)
+
+    def __delitem__(self, demographic: str) -> None:
+        effect_table.set(self.row, demographics.index[demographic], 0.0)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(demographics.names)
+
+    def __len__(self) -> int:
+        return len(demographics)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
 class Descriptor:
 
     def __init__(self, name: str, effects: Dict[str, float] | None = None, fixed: bool = False):
         self.name: str = name
-        self.effects: Dict[str, float] = {} if effects is None else effects
-        add_demographics(*[_ for _ in self.effects.keys()])
-        for demographic in demographics:
-            self.effects.setdefault(demographic, 0.0)
+        self.id: int = effect_table.add_row() # Unique ID, which is also the row of the descriptor's effects
+        descriptors_by_row.append(self)
+        self._effects: Effects = Effects(self.id)
+        if effects:
+            self._effects.update(effects)
         self.fixed: bool = fixed
         descriptors.add(self)
-    
+
+    @property
+    def row(self) -> int:
+        ''' Row of the descriptor's effects in the effect table, and its column in membership matrices. '''
+        return self.id
+
+    @property
+    def effects(self) -> Effects:
+        return self._effects
+
+    @effects.setter
+    def effects(self, effects: Dict[str, float]):
+        effect_table.row(self.row)[:] = 0.0
+        self._effects.update(effects)
+
     def effect_on(self, demographic: str) -> float:
-        return self.effects[demographic]
-    
+        return effect_table.get(self.row, demographics.index[demographic])
+
+    def effect_vector(self) -> np.ndarray:
+        ''' View of the descriptor's effects on every demographic, in column order. '''
+        return effect_table.row(self.row)
+
     def fill_effects(self):
-        for demographic in demographics:
-            if demographic not in self.effects:
-                self.effects[demographic] = 0.0
+        pass # Every demographic always has an effect
     
     def __hash__(self) -> int:
-        return hash(self.name) + sum([hash(_) for _ in self.effects])
+        return self.id
     
     def __eq__(self, other) -> bool:
-        return type(self) == type(other) and \
-               self.name == other.name and \
-               self.effects == other.effects
+        return type(self) == type(other) and self.id == other.id
     
     def __str__(self) -> str:
         nonzeroes = {effect: self.effects[effect] for effect in self.effects if self.effects[effect]}
         return f"{self.name}: {nonzeroes}"
 
-descriptors: Set[Descriptor] = set()
+class DescriptorRegistry:
+    ''' The descriptors in use, for O(1) adding, removing, membership tests and random choice: a list of the
+        descriptors and the position of each in it by ID, and the same for the descriptors which are not fixed.
+        Iterates, adds and tests membership like the set it replaces. '''
 
-demographics: List[str] = []
+    def __init__(self):
+        self._descriptors: List[Descriptor] = []
+        self._positions: Dict[int, int] = {} # ID -> position in _descriptors
+        self._unfixed: List[Descriptor] = []
+        self._unfixed_positions: Dict[int, int] = {} # ID -> position in _unfixed
 
-def add_demographics(*d: str) -> List[str]:
-    global demographics
-    for demographic in d:
-        if demographic not in demographics:
-            demographics.append(demographic)
-    return demographics
\ No newline at end of file
+    @staticmethod
+    def _insert(items: List[Descriptor], positions: Dict[int, int], descriptor: Descriptor) -> None:
+        positions[descriptor.id] = len(items)
+        items.append(descriptor)
+
+    @staticmethod
+    def _delete(items: List[Descriptor], positions: Dict[int, int], descriptor: Descriptor) -> None:
+        # Move the last descriptor into the removed one's place
+        position = positions.pop(descriptor.id)
+        last = items.pop()
+        if last is not descriptor:
+            items[position] = last
+            positions[last.id] = position
+
+    def add(self, descriptor: Descriptor) -> None:
+        if descriptor.id in self._positions:
+            return
+        self._insert(self._descriptors, self._positions, descriptor)
+        if not descriptor.fixed:
+            self._insert(self._unfixed, self._unfixed_positions, descriptor)
+
+    def discard(self, descriptor: Descriptor) -> None:
+        if descriptor.id not in self._positions:
+            return
+        self._delete(self._descriptors, self._positions, descriptor)
+        if descriptor.id in self._unfixed_positions:
+            self._delete(self._unfixed, self._unfixed_positions, descriptor)
+
+    def choice(self, fixed: bool = True) -> Descriptor:
+        ''' Choose a descriptor at random, leaving out fixed descriptors if fixed is False. '''
+        return choice(self._descriptors if fixed else self._unfixed)
+
+    def unfixed_count(self) -> int:
+        return len(self._unfixed)
+
+    def __len__(self) -> int:
+        return len(self._descriptors)
+
+    def __iter__(self) -> Iterator[Descriptor]:
+        return iter(self._descriptors)
+
+    def __contains__(self, descriptor) -> bool:
+        return isinstance(descriptor, Descriptor) and descriptor.id in self._positions
+
+effect_table: EffectTable = EffectTable()
+
+descriptors: DescriptorRegistry = DescriptorRegistry()
+descriptors_by_row: List[Descriptor] = [] # Every descriptor made, by its ID
+
+demographics: Demographics = Demographics()
+
+def add_demographics(*d: str) -> Demographics:
+    demographics.add(*d)
+    return demographics
@@ -1,12 +1,20 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Sequence
 from math import sqrt, log2
-from random import randint, choice, random
-
-from MapEntity import MapEntity, Nation, State, states, County, counties
-from Descriptor import Descriptor, descriptors, DESCRIPTORS_MAX
+from random import randint, choice
+import argparse
+
+import numpy as np
+
+from MapEntity import MapEntity, Nation, State, states, County, counties, read_map_entities
+from Descriptor import Descriptor, descriptors, descriptors_by_row, demographics, effect_table, DESCRIPTORS_MAX
+from Scoring import ScoringEngine, ScoreTable, demographics_matrix
+from Membership import Membership
+from Predictions import Predictions
+from Dataset import Dataset, add_arguments, from_arguments
+from Annealing import Annealer, make_schedule, add_schedule_arguments, annealer_from_arguments
 # from Demographic import Demographic
 
-temperature = 0.05 # How likely a change is to be accepted which decreases score
+method = "l1" # How county demographics are compared: see compare_demographics
 
 def normalize(vec: List[float]) -> List[float]:
     s = sum(vec)
@@ -15,7 +23,6 @@ def normalize(vec: List[float]) -> List[float]:
     return [x/s for x in vec]
 
 def initialize():
-    global descriptors_count
     # Create base descriptors: one for nation, one for each state
     Nation.get_instance().descriptors.append(Descriptor("nation", {}, True))
     for state in states:
@@ -23,6 +30,7 @@ def initialize():
     # Initialize all other descriptors
     for i in range(DESCRIPTORS_MAX):
         descriptors.add(Descriptor(f"Descriptor {i}", {}))
+    score_all_counties()
 
 # favor descriptors which reflect real life - Accuracy
 accuracy = 2.0 # Accuracy of 2x is 1 plus this many times better than Accuracy of 1x
@@ -148,10 +156,79 @@ def compare_demographics(expected: Dict[Any, float], actual: Dict[Any, float], m
 
     raise ValueError(f"Unknown method: {method}")
 
-county_scores = {county: compare_demographics(county.normalized_demographics, county.descriptor_demographics()) for county in counties}
+county_scores: ScoreTable = ScoreTable(0) # Score of the county in each row, filled by score_all_counties
+
+engine: ScoringEngine | None = None
+membership: Membership | None = None # Descriptors assigned to each entity during a run: see sync_descriptors
+predictions: Predictions | None = None # Predicted demographics of each county, from the membership and effects
+entities: List[MapEntity] = [] # Entity in each row of the membership matrix: the counties (in order), the states, then the nation
+entity_rows: Dict[MapEntity, int] = {} # Row of each entity in the membership matrix
+state_counties: Dict[State, np.ndarray] = {} # Rows of each state's counties
+def build_engine():
+    ''' Arrange the counties' demographics as a matrix for the scoring engine, which shares the descriptors'
+        effect table, and the descriptors of every entity as a membership matrix. Build again after making more
+        descriptors or demographics. '''
+    global engine, membership, predictions
+    observed = demographics_matrix([county.normalized_demographics for county in counties], demographics)
+    engine = ScoringEngine(observed, effect_table.matrix(), method)
+    entities[:] = counties + states + [Nation.get_instance()]
+    entity_rows.clear()
+    entity_rows.update({entity: row for row, entity in enumerate(entities)})
+    state_counties.clear()
+    for state in states:
+        state_counties[state] = np.array([row for row, county in enumerate(counties) if county.state is state], dtype=np.int64)
+    membership = Membership(len(entities), effect_table.rows)
+    for row, entity in enumerate(entities):
+        for descriptor in entity.descriptors:
+            membership.add(row, descriptor.row)
+    predictions = Predictions(len(counties), predicted_demographics)
+
+def sync_descriptors():
+    ''' Copy the descriptors assigned in the membership matrix back to each entity's list of descriptors. '''
+    for row, entity in enumerate(entities):
+        entity.descriptors = [descriptors_by_row[column] for column in membership.columns(row)]
+
+def counties_of(row: int) -> np.ndarray:
+    ''' Rows of the counties whose predicted demographics include the descriptors of the entity in a row. '''
+    entity = entities[row]
+    if isinstance(entity, County):
+        return np.array([row], dtype=np.int64)
+    if isinstance(entity, State):
+        return state_counties[entity]
+    return np.arange(len(counties))
+
+def county_uses(descriptor: Descriptor) -> np.ndarray:
+    ''' Rows of the counties which use a descriptor, directly or through their state or the nation, once for each
+        way they use it. '''
+    users = membership.users(descriptor.row)
+    if len(users) == 0:
+        return users
+    return np.concatenate([counties_of(row) for row in users])
+
+def predicted_demographics(rows: Sequence[int]) -> np.ndarray:
+    ''' Predicted demographics of the counties in rows: the effects of their own descriptors, their state's
+        and the nation's. '''
+    rows = list(rows)
+    state_rows = [entity_rows[counties[row].state] for row in rows]
+    nation_row = entity_rows[Nation.get_instance()]
+    return membership.product(engine.effects, rows) + membership.product(engine.effects, state_rows) + membership.product(engine.effects, [nation_row])
+
+def score_counties(rows: Sequence[int]):
+    ''' Score the counties in rows together with the scoring engine, and cache their scores. '''
+    if not len(rows):
+        return
+    county_scores.update(rows, engine.scores(rows, predictions[rows]))
+
+def score_all_counties():
+    ''' Fill the cache of county scores. Call once the counties and descriptors are made. '''
+    global county_scores
+    build_engine()
+    county_scores = ScoreTable(len(counties))
+    score_counties(range(len(counties)))
+
 def score_counties_accuracies() -> float:
     ''' Scores all counties and returns the average accuracy. '''
-    return sum(county_scores.values()) / len(county_scores)
+    return county_scores.average()
 
 class Change:
     def __init__(self, undo_fn):
@@ -163,90 +240,93 @@ def permute() -> Change:
     # Pick randomly an entity to add / remove descriptor, or a descriptor to add / remove / change effect
     if randint(0,1): # Add or remove descriptor from a county or state
         # Pick a county or state
-        entity: MapEntity = choice(counties + states)
+        row = randint(0, len(counties) + len(states) - 1)
         # Choose whether to add or remove descriptor
         if randint(0,1): # Add
             # Choose a descriptor to add
-            descriptor: Descriptor = choice(list(descriptors))
-            if descriptor.fixed:
-                return permute() # Cannot change the descriptor: try again
+            descriptor: Descriptor = descriptors.choice(fixed=False)
             # Add it to the entity's descriptors
-            entity.descriptors.append(descriptor)
+            if not membership.add(row, descriptor.row):
+                return permute() # Already has the descriptor: try again
+            affected = counties_of(row)
+            saved = predictions.save(affected)
             def undo():
-                entity.descriptors.remove(descriptor)
-                if isinstance(entity, County):
-                    county_scores[entity] = compare_demographics(entity.normalized_demographics, entity.descriptor_demographics(), "l1")
+                membership.remove(row, descriptor.row)
+                predictions.restore(affected, saved)
+                score_counties(affected)
             # Update the cache
-            if isinstance(entity, County):
-                county_scores[entity] = compare_demographics(entity.normalized_demographics, entity.descriptor_demographics(), "l1")
+            predictions.add(affected, descriptor.effect_vector())
+            score_counties(affected)
             return Change(undo)
         else: # Remove
-            if len(entity.descriptors) == 0:
+            if membership.count(row) == 0:
                 return permute() # Nothing to remove: try again
             # Choose a descriptor to remove
-            descriptor: Descriptor = choice(entity.descriptors)
+            descriptor: Descriptor = descriptors_by_row[choice(membership.columns(row))]
             if descriptor.fixed:
                 return permute() # Cannot change the descriptor: try again
             # Remove it from the entity's descriptors
-            entity.descriptors.remove(descriptor)
+            membership.remove(row, descriptor.row)
+            affected = counties_of(row)
+            saved = predictions.save(affected)
             def undo():
-                entity.descriptors.append(descriptor)
-                if isinstance(entity, County):
-                    county_scores[entity] = compare_demographics(entity.normalized_demographics, entity.descriptor_demographics(), "l1")
+                membership.add(row, descriptor.row)
+                predictions.restore(affected, saved)
+                score_counties(affected)
             # Update the cache
-            if isinstance(entity, County):
-                county_scores[entity] = compare_demographics(entity.normalized_demographics, entity.descriptor_demographics(), "l1")
+            predictions.add(affected, descriptor.effect_vector(), -1.0)
+            score_counties(affected)
             return Change(undo)
     else: # Add, remove, or change a descriptor's effect
         # Pick a descriptor
-        descriptor: Descriptor = choice(list(descriptors))
+        descriptor: Descriptor = descriptors.choice()
         # Choose an effect to change
-        effect: str = choice([_ for _ in descriptor.effects.keys()])
+        effect: str = choice(demographics.names)
         # Determine how much to change by
         change = 0.001 if randint(0,1) else -0.001
         old_value = descriptor.effects[effect]
-        descriptor.effects[effect] += change
-        # Refresh any county using this descriptor
-        affected = [c for c in counties if descriptor in c.descriptors]
-        for c in affected:
-            county_scores[c] = compare_demographics(c.normalized_demographics, c.descriptor_demographics(), "l1")
+        descriptor.effects[effect] = old_value + change
+        # Refresh any county using this descriptor, directly or through its state or the nation
+        uses = county_uses(descriptor)
+        affected = np.unique(uses)
+        column = demographics.column(effect)
+        saved = predictions.save(affected, column)
+        predictions.add_to_column(uses, column, change)
+        score_counties(affected)
         def undo():
             descriptor.effects[effect] = old_value
-            for c in affected:
-                county_scores[c] = compare_demographics(c.normalized_demographics, c.descriptor_demographics(), "l1")
+            predictions.restore(affected, saved, column)
+            score_counties(affected)
         return Change(undo)
 
-prev_score = 0
-def run():
-
-    prev_score = score()
-
-    while True:
-        change = permute()
-        new_score = score()
-        print(f"{new_score}")
-        if new_score - prev_score < 0 and random() > temperature:
-            # Restore previous state
-            change.undo()
-        else:
-            # Accept the change
-            prev_score = new_score
+def run(annealer: Annealer | None = None, steps: int | None = None, seconds: float | None = None) -> float:
+    ''' Anneal for a number of steps or seconds, or until interrupted, printing statistics for each phase.
+        Returns the best score reached. '''
+    annealer = Annealer(permute, score, make_schedule("adaptive")) if annealer is None else annealer
+    return annealer.run(steps, seconds)
 
-def main() -> None:
+def main(dataset: Dataset | None = None, annealer: Annealer | None = None, steps: int | None = None, seconds: float | None = None) -> None:
 
+    read_map_entities(dataset)
     initialize()
 
     try:
-        run()
+        run(annealer, steps, seconds)
     except KeyboardInterrupt:
-        with open("logs\\log.out",'w',encoding='utf-8') as out:
-            out.write(str(Nation.get_instance()) + "\n")
-            for state in states:
-                out.write(str(state) + "\n")
-            for county in counties:
-                out.write(str(county) + "\n")
-            for descriptor in descriptors:
-                out.write(str(descriptor) + "\n")
+        pass
+    sync_descriptors()
+    with open("logs\\log.out",'w',encoding='utf-8') as out:
+        out.write(str(Nation.get_instance()) + "\n")
+        for state in states:
+            out.write(str(state) + "\n")
+        for county in counties:
+            out.write(str(county) + "\n")
+        for descriptor in descriptors:
+            out.write(str(descriptor) + "\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Assign descriptors to counties")
+    add_arguments(parser)
+    add_schedule_arguments(parser)
+    args = parser.parse_args()
+    main(from_arguments(args), annealer_from_arguments(args, permute, score), args.steps, args.seconds)
\ No newline at end of file
@@ -4,6 +4,8 @@ import os
 
 # from Demographic import Demographic, DemographicGroup
 from Descriptor import Descriptor, add_demographics
+from CountyData import flatten_dict
+from Dataset import Dataset
 
 class MapEntity:
     def __init__(self, name: str, population: int, demographics: Dict[str, float], descriptors: List[Descriptor] | None = None):
@@ -108,47 +110,35 @@ def read_nation():
     Nation.from_json(data) # Saves to Nation._instance
 
 states: List[State] = []
-def read_states():
+def read_states(dataset: Dataset | None = None):
     # TODO: Determine how to store demographics: as dictionary of subdictionaries, or as flat list? 
-    global states
-    states = []
+    dataset = Dataset() if dataset is None else dataset
+    states.clear()
     for directory in os.listdir("src\\main\\resources"):
-        if not '.' in directory:
+        if not '.' in directory and dataset.includes_state(directory):
             data_file = [file for file in os.listdir("src\\main\\resources\\" + directory) if '.' in file][0]
             with open("src\\main\\resources\\" + directory + "\\" + data_file) as data:
                 j: Dict[str, Any] = json.loads(data.read())
                 states.append(State(j["name"], j["population"], flatten_dict(j["demographics"])))
 
 counties: List[County] = []
-def read_counties():
-    global counties
-    counties = []
+def read_counties(dataset: Dataset | None = None):
+    dataset = Dataset() if dataset is None else dataset
+    counties.clear()
     if not len(states):
         return None 
-    for state_name in os.listdir("src\\main\\resources"):
-        if not '.' in state_name:
-            state = [s for s in states if s.name.lower().replace(" ","_") == state_name][0]
-            for county_file in [i for i in os.listdir("src\\main\\resources\\" + state_name + "\\counties") if '.' in i]:
-                with open("src\\main\\resources\\" + state_name + "\\counties\\" + county_file) as data:
-                    j: Dict[str, Any] = json.loads(data.read())
-                    counties.append(County(state, j["name"], j["population"], flatten_dict(j["demographics"])))
-
-def flatten_dict(d: Dict[str, Any], parent_key: str = "", sep: str = "->", result = None):
-    if result is None:
-        result = {}
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            flatten_dict(v, new_key, sep, result)
-        elif isinstance(v, float):
-            result[new_key] = v
-        else:
-            raise TypeError(f"Unsupported type for key {new_key}: {type(v)}")
-    return result
-
-# On Import
-print("Reading Map Entities...")
-read_nation()
-read_states()
-read_counties()
-print(f"{len(states)+len(counties)+1} Map Entities read successfully")
\ No newline at end of file
+    states_by_folder = {s.name.lower().replace(" ","_"): s for s in states}
+    data = dataset.data
+    for row in dataset.rows:
+        state = states_by_folder[str(data.states[row])]
+        counties.append(County(state, str(data.names[row]), int(data.population[row]), data.demographics_dict(row)))
+
+def read_map_entities(dataset: Dataset | None = None):
+    ''' Read the nation, and the states and counties in the dataset (all of them by default). The states and
+        counties lists are filled in place, so modules which imported them see the entities. '''
+    dataset = Dataset() if dataset is None else dataset
+    print(f"Reading Map Entities ({dataset})...")
+    read_nation()
+    read_states(dataset)
+    read_counties(dataset)
+    print(f"{len(states)+len(counties)+1} Map Entities read successfully")
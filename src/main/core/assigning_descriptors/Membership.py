@@ -0,0 +1,69 @@
+from typing import List, Dict, Tuple, Sequence
+
+import numpy as np
+
+class Membership:
+    ''' Which descriptors are assigned to which counties: a boolean matrix, with a row per county (or other
+        entity) and a column per descriptor, stored as two indexes of its set entries. A row index holds the
+        columns set in each row, giving O(1) membership tests and changes, and letting predicted demographics
+        read only the effect rows of assigned descriptors rather than multiplying by the whole matrix. A column
+        index holds the rows set in each column, so finding the users of a descriptor costs in proportion to its
+        number of users, not the number of counties. Both are kept up to date on every change. '''
+
+    def __init__(self, rows: int, columns: int):
+        self.shape: Tuple[int, int] = (rows, columns)
+        self._columns: List[Dict[int, None]] = [{} for _ in range(rows)] # Columns set in each row, in the order they were set
+        self._rows: List[Dict[int, None]] = [{} for _ in range(columns)] # Rows set in each column
+
+    def has(self, row: int, column: int) -> bool:
+        return column in self._columns[row]
+
+    def add(self, row: int, column: int) -> bool:
+        ''' Assign a column to a row. Returns whether it was not already assigned. '''
+        if column in self._columns[row]:
+            return False
+        self._columns[row][column] = None
+        self._rows[column][row] = None
+        return True
+
+    def remove(self, row: int, column: int) -> bool:
+        ''' Unassign a column from a row. Returns whether it was assigned. '''
+        if column not in self._columns[row]:
+            return False
+        del self._columns[row][column]
+        del self._rows[column][row]
+        return True
+
+    def toggle(self, row: int, column: int) -> bool:
+        ''' Assign a column to a row if it is not assigned, otherwise unassign it. Returns whether it is now assigned. '''
+        if self.remove(row, column):
+            return False
+        self.add(row, column)
+        return True
+
+    def columns(self, row: int) -> List[int]:
+        ''' Columns assigned to a row, in the order they were assigned. '''
+        return list(self._columns[row])
+
+    def count(self, row: int) -> int:
+        return len(self._columns[row])
+
+    def users(self, column: int) -> np.ndarray:
+        ''' Rows which a column is assigned to, from the inverted index. '''
+        return np.fromiter(self._rows[column], dtype=np.int64, count=len(self._rows[column]))
+
+    def user_count(self, column: int) -> int:
+        return len(self._rows[column])
+
+    def product(self, values: np.ndarray, rows: Sequence[int]) -> np.ndarray:
+        ''' For each of rows, the sum of the rows of values (one per column) assigned to it: the product of the
+            membership matrix and values, computed from only the assigned entries. '''
+        lengths = np.array([len(self._columns[row]) for row in rows], dtype=np.int64)
+        result = np.zeros((len(lengths), values.shape[1]))
+        if not lengths.sum():
+            return result
+        indices = np.fromiter((column for row in rows for column in self._columns[row]), dtype=np.int64, count=int(lengths.sum()))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        filled = lengths > 0
+        result[filled] = np.add.reduceat(values[indices], starts[filled], axis=0)
+        return result
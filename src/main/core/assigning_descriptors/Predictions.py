@@ -0,0 +1,54 @@
+from typing import Callable, Sequence
+
+import numpy as np
+
+class Predictions:
+    ''' Predicted demographics of every county, kept as a counties x demographics matrix and updated in place when
+        descriptors are assigned or their effects change, instead of summing every descriptor's effects again.
+        Adding or removing a descriptor adds or subtracts its effect row: O(demographics) per county. Changing one
+        effect adds the difference to one column: O(1) per county.
+        compute(rows) must give the predicted demographics of rows from scratch. It fills the matrix at first, and
+        refills it every REBUILD_INTERVAL updates, so rounding errors from the updates cannot build up. '''
+
+    REBUILD_INTERVAL = 10000
+
+    def __init__(self, size: int, compute: Callable[[Sequence[int]], np.ndarray]):
+        self.compute: Callable[[Sequence[int]], np.ndarray] = compute
+        self.size: int = size
+        self.matrix: np.ndarray = compute(range(size))
+        self._updates: int = 0
+
+    def __getitem__(self, rows) -> np.ndarray:
+        return self.matrix[rows]
+
+    def rebuild(self) -> None:
+        ''' Compute every county's predicted demographics from scratch. '''
+        self.matrix = self.compute(range(self.size))
+        self._updates = 0
+
+    def _updated(self) -> None:
+        self._updates += 1
+        if self._updates >= self.REBUILD_INTERVAL:
+            self.rebuild()
+
+    def add(self, rows: Sequence[int], effects: np.ndarray, sign: float = 1.0) -> None:
+        ''' Add a descriptor's effect row to the counties in rows (subtract it, with sign -1). Rows may repeat:
+            a county using the descriptor twice gets it twice. '''
+        np.add.at(self.matrix, np.asarray(rows, dtype=np.int64), sign * effects)
+        self._updated()
+
+    def add_to_column(self, rows: Sequence[int], column: int, delta: float) -> None:
+        ''' Add a change in one effect to the counties in rows. Rows may repeat, as in add. '''
+        np.add.at(self.matrix[:, column], np.asarray(rows, dtype=np.int64), delta)
+        self._updated()
+
+    def save(self, rows: Sequence[int], column: int | None = None) -> np.ndarray:
+        ''' Copy the predictions of rows (only one column of them, if column is set) to restore later. '''
+        return self.matrix[rows].copy() if column is None else self.matrix[rows, column].copy()
+
+    def restore(self, rows: Sequence[int], saved: np.ndarray, column: int | None = None) -> None:
+        ''' Put back predictions copied by save, undoing any updates to them since exactly. '''
+        if column is None:
+            self.matrix[rows] = saved
+        else:
+            self.matrix[rows, column] = saved
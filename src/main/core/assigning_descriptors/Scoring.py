@@ -0,0 +1,148 @@
+from typing import List, Dict, Sequence
+import math
+
+import numpy as np
+
+METHODS = ["l1", "l2", "cosine", "js", "dot"]
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    ''' Divide each row of a matrix by its sum. Rows which sum to zero become zeros. '''
+    sums = matrix.sum(axis=1, keepdims=True)
+    return np.divide(matrix, sums, out=np.zeros(matrix.shape), where=sums != 0)
+
+def _kl(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    ''' KL-divergence of each row of p from the same row of q, over the entries where both are positive. '''
+    both = (p > 0) & (q > 0)
+    ratio = np.divide(p, q, out=np.ones(p.shape), where=both)
+    return np.where(both, p * np.log2(ratio), 0.0).sum(axis=1)
+
+def similarities(expected: np.ndarray, actual: np.ndarray, method: str = "l1", empty_score: float | None = None) -> np.ndarray:
+    ''' Compare each row of expected with the same row of actual, the way compare_demographics compares two
+        dictionaries. Returns a similarity per row (1 = identical, 0 = most different).
+        Methods:
+            "l1"        sum abs differences
+            "l2"        eucledian norm
+            "cosine"    cosine similarity or angle of vectors
+            "js"        Jensen-Shannon divergence
+            "dot"       dot product of the normalized rows (Test.compare_demographics' "cosine")
+        If empty_score is set, rows where actual is all zero but expected is not get that score instead.
+    '''
+    e = normalize_rows(expected)
+    a = normalize_rows(actual)
+
+    if method == "l1":
+        result = 1 - np.abs(e - a).sum(axis=1) / 2
+    elif method == "l2":
+        result = 1 - np.sqrt(((e - a) ** 2).sum(axis=1)) / 2
+    elif method == "cosine":
+        dot = (e * a).sum(axis=1)
+        result = dot / (np.sqrt((e * e).sum(axis=1)) * np.sqrt((a * a).sum(axis=1)) + 1e-12)
+    elif method == "dot":
+        result = (e * a).sum(axis=1)
+    elif method == "js":
+        m = (e + a) / 2
+        result = np.clip(1 - (_kl(e, m) + _kl(a, m)) / 2, 0.0, 1.0)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    if empty_score is not None:
+        result[(actual.sum(axis=1) == 0) & (expected.sum(axis=1) != 0)] = empty_score
+    return result
+
+def demographics_matrix(dicts: Sequence[Dict[str, float]], columns: List[str]) -> np.ndarray:
+    ''' Arrange demographic dictionaries as the rows of a matrix, with a column for each name in columns. Missing
+        demographics are zero. '''
+    index = {column: i for i, column in enumerate(columns)}
+    matrix = np.zeros((len(dicts), len(columns)))
+    for row, d in enumerate(dicts):
+        for demographic, value in d.items():
+            matrix[row, index[demographic]] = value
+    return matrix
+
+class ScoringEngine:
+    ''' Scores counties by comparing predicted demographics with observed demographics, many counties at once.
+        Holds the observed demographics as a counties x demographics matrix and the descriptor effects as a
+        descriptors x demographics matrix. A county's predicted demographics is the sum of the effect rows of the
+        descriptors assigned to it.
+        If rows is given, county i is row rows[i] of observed, and if columns is, demographic j is its column
+        columns[j], so observed can be the memory-mapped county data itself, whose pages every process scoring it
+        shares, instead of a copy of the counties' demographics. '''
+
+    def __init__(self, observed: np.ndarray, effects: np.ndarray, method: str = "l1", empty_score: float | None = None, rows: np.ndarray | None = None, columns: np.ndarray | None = None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        self.observed: np.ndarray = observed
+        self.rows: np.ndarray | None = rows
+        self.columns: np.ndarray | None = columns
+        self.effects: np.ndarray = effects
+        self.method: str = method
+        self.empty_score: float | None = empty_score
+
+    def predicted(self, assignments: Sequence[Sequence[int]]) -> np.ndarray:
+        ''' Predicted demographics of counties, from lists of the effect rows of the descriptors assigned to each. '''
+        result = np.zeros((len(assignments), self.effects.shape[1]))
+        for i, rows in enumerate(assignments):
+            if len(rows):
+                result[i] = self.effects[list(rows)].sum(axis=0)
+        return result
+
+    def scores(self, counties: Sequence[int], predicted: np.ndarray) -> np.ndarray:
+        ''' Score the counties in the rows counties against their predicted demographics (a row for each). '''
+        if self.rows is None:
+            return similarities(self.observed[list(counties)], predicted, self.method, self.empty_score)
+        if self.columns is None:
+            return similarities(self.observed[self.rows[list(counties)]], predicted, self.method, self.empty_score)
+        return similarities(self.observed[np.ix_(self.rows[list(counties)], self.columns)], predicted, self.method, self.empty_score)
+
+class ScoreTable:
+    ''' The score of every county, with their running total, so the average score costs O(1) and updating scores
+        costs only the counties which changed. The total is a compensated (Neumaier) sum, carrying the low digits
+        which each addition rounds off, so it stays equal to the sum of the scores however far they swing: a plain
+        running total loses every digit of a small total after adding and removing a score near 1e17. '''
+
+    def __init__(self, size: int):
+        self.scores: np.ndarray = np.zeros(size)
+        self.total: float = 0.0
+        self._sum: float = 0.0 # Running sum, and the rounding error it has lost so far
+        self._error: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __getitem__(self, row: int) -> float:
+        return float(self.scores[row])
+
+    def update(self, rows: Sequence[int], values: np.ndarray) -> None:
+        ''' Set the scores of the counties in rows, adding the new scores to the total and taking the old ones off. '''
+        rows = np.asarray(rows, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        old = self.scores[rows].tolist()
+        self.scores[rows] = values
+        for value in values.tolist():
+            self._add(value)
+        for value in old:
+            self._add(-value)
+        self.total = self._sum + self._error
+        if not math.isfinite(self.total):
+            self.resum() # An infinite or NaN score cannot be taken off the running sum again
+
+    def _add(self, value: float) -> None:
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._error += (self._sum - total) + value
+        else:
+            self._error += (value - total) + self._sum
+        self._sum = total
+
+    def resum(self) -> None:
+        ''' Sum the total again from the scores. '''
+        self._sum, self._error = 0.0, 0.0
+        if np.isfinite(self.scores).all():
+            for value in self.scores.tolist():
+                self._add(value)
+            self.total = self._sum + self._error
+        else:
+            self.total = self._sum = float(self.scores.sum()) # Until the score is replaced, which sums them again
+
+    def average(self) -> float:
+        return self.total / len(self.scores) if len(self.scores) else 0.0
@@ -0,0 +1,176 @@
+from typing import List, Dict, Set, Any
+from math import exp
+from multiprocessing import Process, Pipe, parent_process
+from multiprocessing.connection import Connection
+import argparse
+import os
+import random
+import signal
+import time
+
+import Test
+from Dataset import Dataset, add_arguments, from_arguments
+from CountyData import get_county_data
+from Annealing import Annealer, ConstantSchedule
+
+REPLICAS = os.cpu_count() or 1 # Replicas to run, if not given: one per core
+SWAP_INTERVAL = 10000 # Steps each replica takes between swaps
+HOT_ACCEPTANCE = 0.2 # Share of worse changes the hottest replica keeps
+COLD_ACCEPTANCE = 0.0001 # Share of worse changes the coldest replica keeps
+
+def acceptance_ladder(count: int, cold: float = COLD_ACCEPTANCE, hot: float = HOT_ACCEPTANCE) -> List[float]:
+    ''' Shares of worse changes for count replicas to keep, from coldest to hottest, evenly spaced on a log scale. '''
+    if count == 1:
+        return [cold]
+    return [cold * (hot / cold) ** (i / (count - 1)) for i in range(count)]
+
+def _replica(connection: Connection, dataset: Dataset, seed: int) -> None:
+    ''' Run one replica in a worker process: read the counties of the dataset from the memory-mapped county data
+        (so every replica shares its pages), make descriptors, then run commands from the connection until it
+        is told to stop. '''
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Interrupting the run stops the ladder, which then asks for a result
+    random.seed(seed)
+    Test.read_counties(dataset)
+    Test.initialize()
+    annealer = Annealer(Test.permute, Test.score, ConstantSchedule(start=0.0), report=None)
+    parent = parent_process()
+    while True:
+        # Stop if the ladder's process died without saying so: other replicas may hold the connection open
+        while not connection.poll(1.0):
+            if parent is not None and not parent.is_alive():
+                return
+        command, *args = connection.recv()
+        if command == "run": # Take steps at the temperature keeping a share of worse changes, and send back the scores
+            acceptance, steps = args
+            temperature = annealer.estimate_temperature(acceptance)
+            annealer.schedule = ConstantSchedule(start=temperature)
+            annealer.phase_length = steps
+            annealer.run(steps)
+            connection.send((annealer.current, annealer.best, temperature))
+        elif command == "result":
+            connection.send(Test.result())
+        elif command == "stop":
+            connection.close()
+            return
+
+class ParallelTempering:
+    ''' Parallel tempering: replicas of the search, each in its own process, run at a ladder of temperatures. The
+        hot replicas wander between optima, the cold ones refine them, and after every swap_interval steps
+        neighbouring temperatures are swapped between replicas with the Metropolis chance, so good states found
+        hot are passed down to be refined. Temperatures are swapped instead of states, so no state is sent
+        between processes.
+        Each rung keeps a share of worse changes from acceptance_ladder, and its temperature is estimated for that
+        share from the replica's own state every round, following the size of score changes as the search
+        improves. Until a replica sees a worse change (as when nothing is assigned yet), it is greedy. '''
+
+    def __init__(self, dataset: Dataset, replicas: int = REPLICAS, swap_interval: int = SWAP_INTERVAL, seed: int | None = None):
+        self.dataset: Dataset = dataset
+        self.swap_interval: int = swap_interval
+        self.targets: List[float] = acceptance_ladder(replicas)
+        self.temperatures: List[float] = [0.0] * replicas # Temperature of each rung of the ladder in the last round, coldest first
+        self.rungs: List[int] = list(range(replicas)) # Replica at each rung
+        self.scores: List[float] = [0.0] * replicas # Current score of each replica
+        self.best: float = 0.0
+        self.swaps: List[int] = [0] * max(0, replicas - 1) # Swaps made between each rung and the next
+        self.attempts: List[int] = [0] * max(0, replicas - 1)
+        self.rounds: int = 0
+        self._pending: Set[int] = set() # Replicas which have not answered the last command yet
+        seed = random.randrange(2 ** 32) if seed is None else seed
+        # Every replica must choose the same sample of counties
+        if dataset.sample is not None and dataset.seed is None:
+            dataset.seed = seed
+        get_county_data() # Build the county data once, before the replicas read it
+        self._connections: List[Connection] = []
+        self._processes: List[Process] = []
+        for replica in range(replicas):
+            parent, child = Pipe()
+            process = Process(target=_replica, args=(child, dataset, seed + replica), daemon=True)
+            process.start()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def _round(self) -> None:
+        ''' Run every replica for swap_interval steps at its rung's temperature, then try swaps. '''
+        for rung, replica in enumerate(self.rungs):
+            self._connections[replica].send(("run", self.targets[rung], self.swap_interval))
+            self._pending.add(replica)
+        for rung, replica in enumerate(self.rungs):
+            self.scores[replica], best, self.temperatures[rung] = self._connections[replica].recv()
+            self._pending.discard(replica)
+            self.best = max(self.best, best)
+        # Try swapping every other pair of neighbouring rungs, alternating which pairs each round
+        for rung in range(self.rounds % 2, len(self.rungs) - 1, 2):
+            self._try_swap(rung)
+        self.rounds += 1
+
+    def _try_swap(self, rung: int) -> None:
+        ''' Swap the replicas at a rung and the next hotter rung with the Metropolis chance. '''
+        cold, hot = self.temperatures[rung], self.temperatures[rung + 1]
+        if cold <= 0 or hot <= 0:
+            return
+        self.attempts[rung] += 1
+        # Worth swapping when the hotter replica has the better score, and sometimes otherwise
+        exponent = (1 / cold - 1 / hot) * (self.scores[self.rungs[rung + 1]] - self.scores[self.rungs[rung]])
+        if exponent >= 0 or random.random() < exp(exponent):
+            self.rungs[rung], self.rungs[rung + 1] = self.rungs[rung + 1], self.rungs[rung]
+            self.swaps[rung] += 1
+
+    def report(self, seconds: float) -> str:
+        ''' Describe the ladder after a number of seconds. '''
+        rungs = ", ".join(f"{self.scores[replica]:.6f} at T {temperature:.3g}" for replica, temperature in zip(self.rungs, self.temperatures))
+        swaps = ", ".join(f"{swaps}/{attempts}" for swaps, attempts in zip(self.swaps, self.attempts))
+        steps = (self.rounds * self.swap_interval * len(self.rungs)) / seconds if seconds else 0.0
+        return f"Round {self.rounds}: best {self.best:.6f}; {rungs}; swaps made {swaps}; {steps:.0f} steps/s in all"
+
+    def run(self, rounds: int | None = None, seconds: float | None = None) -> float:
+        ''' Run for a number of rounds, a number of seconds, or (with neither) until interrupted, printing the
+            ladder after every round. Returns the best score reached. '''
+        started = time.perf_counter()
+        while (rounds is None or self.rounds < rounds) and (seconds is None or time.perf_counter() - started < seconds):
+            self._round()
+            print(self.report(time.perf_counter() - started))
+        return self.best
+
+    def result(self) -> Dict[str, Any]:
+        ''' The result of the replica with the best current score. '''
+        # Wait for a round cut short by an interrupt
+        for replica in list(self._pending):
+            self.scores[replica], best, _ = self._connections[replica].recv()
+            self.best = max(self.best, best)
+            self._pending.discard(replica)
+        replica = max(range(len(self.rungs)), key=lambda r: self.scores[r])
+        self._connections[replica].send(("result",))
+        return self._connections[replica].recv()
+
+    def close(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+def main(dataset: Dataset | None = None, replicas: int = REPLICAS, swap_interval: int = SWAP_INTERVAL, rounds: int | None = None, seconds: float | None = None, seed: int | None = None) -> None:
+    tempering = ParallelTempering(Dataset() if dataset is None else dataset, replicas, swap_interval, seed)
+    try:
+        try:
+            tempering.run(rounds, seconds)
+        except KeyboardInterrupt:
+            pass
+        Test.write_output(tempering.result())
+    finally:
+        tempering.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assign descriptors to counties by parallel tempering")
+    add_arguments(parser)
+    parser.add_argument("--replicas", type=int, default=REPLICAS, help=f"replicas to run, each in its own process (default: {REPLICAS}, one per core)")
+    parser.add_argument("--swap-interval", type=int, default=SWAP_INTERVAL, help=f"steps each replica takes between swaps (default: {SWAP_INTERVAL})")
+    parser.add_argument("--rounds", type=int, help="stop after this many rounds of steps and swaps")
+    parser.add_argument("--seconds", type=float, help="stop after this many seconds")
+    parser.add_argument("--run-seed", type=int, help="seed for the replicas' searches")
+    args = parser.parse_args()
+    main(from_arguments(args), args.replicas, args.swap_interval, args.rounds, args.seconds, args.run_seed)
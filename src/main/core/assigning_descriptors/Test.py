@@ -1,21 +1,33 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple, Sequence, Any
 import numpy as np
 from random import choice, random
+from itertools import cycle
+import argparse
 import os
 
-from County import County, counties
-from Descriptor import Descriptor, descriptors
+from County import counties, read_counties
+from Descriptor import Descriptor, descriptors, descriptors_by_row, demographics, effect_table
+from Scoring import ScoringEngine, ScoreTable, demographics_matrix
+from Membership import Membership
+from Predictions import Predictions
+from Dataset import Dataset, add_arguments, from_arguments
+from CountyData import DemographicsRow
+from Annealing import Annealer, make_schedule, add_schedule_arguments, annealer_from_arguments
 
 MAX_DESCRIPTORS = 300 # Max # of descriptors (including fixed Nation and State descriptors)
 def initialize():
     ''' Assign base descriptors (nation, state) to each county, and create blank descriptors up to MAX_DESCRIPTORS. '''
     nation = Descriptor("Nation", fixed=True)
+    state_descriptors: Dict[str, Descriptor] = {}
     for county in counties:
+        if county.state not in state_descriptors:
+            state_descriptors[county.state] = Descriptor(county.state, fixed=True)
         county.descriptors.append(nation)
-        county.descriptors.append(Descriptor(county.state, fixed=True))
-        score_county(county)
+        county.descriptors.append(state_descriptors[county.state])
     while len(descriptors) < MAX_DESCRIPTORS:
         Descriptor(f"Descriptor {len(descriptors)}")
+    build_engine()
+    score_counties(range(len(counties)))
 
 def normalize(vec: List[float]) -> List[float]:
     ''' Normalize a positive vector of any length. '''
@@ -73,96 +85,138 @@ def permute_descriptors() -> Change | None:
     if len(descriptors) == 0:
         return None
     # Select a descriptor to modify
-    descriptor = choice(list(descriptors))
+    descriptor = descriptors.choice()
     # Select an effect in the descriptor to modify
     if not descriptor.effects:
         return None
-    effect = choice(list(descriptor.effects.keys()))
+    effect = choice(demographics.names)
     # Choose how much to modify
     mod = (random() - 0.5) * 2 * MAX_PERMUTE_CHANGE # Range: [-MAX_PERMUTE_CHANCE, MAX_PERMUTE_CHANCE]
     old_value = descriptor.effects[effect]
-    descriptor.effects[effect] = min(1.0, max(0.0, old_value + mod)) # Clamp to [0.0, 1.0]
-    for county in counties:
-        if descriptor in county.descriptors:
-            county.recalculate = True
-            score_county(county)
+    new_value = min(1.0, max(0.0, old_value + mod)) # Clamp to [0.0, 1.0]
+    descriptor.effects[effect] = new_value
+    # Only the changed effect's column of the counties using the descriptor changes
+    affected = membership.users(descriptor.row)
+    column = demographics.column(effect)
+    saved = predictions.save(affected, column)
+    predictions.add_to_column(affected, column, new_value - old_value)
+    score_counties(affected)
     def undo():
         descriptor.effects[effect] = old_value
-        for county in counties:
-            if descriptor in county.descriptors:
-                score_county(county)
+        predictions.restore(affected, saved, column)
+        score_counties(affected)
     return Change(undo)
 
 def permute_counties() -> Change | None:
     if len(counties) == 0:
         return None
     # Select a county to modify
-    county = choice(counties)
-    # Select a modifiable descriptor
-    descriptor = choice([_ for _ in descriptors if not _.fixed])
-    if descriptor in county.descriptors:
-        county.descriptors.remove(descriptor)
-        county.recalculate = True
-    else:
-        county.descriptors.append(descriptor)
-        county.recalculate = True
+    row = choice(range(len(counties)))
+    # Select a modifiable descriptor, and assign it to the county if it is not, or unassign it if it is
+    if descriptors.unfixed_count() == 0:
+        return None
+    descriptor = descriptors.choice(fixed=False)
+    saved = predictions.save([row])
+    assigned = membership.toggle(row, descriptor.row)
+    predictions.add([row], descriptor.effect_vector(), 1.0 if assigned else -1.0)
+    score_counties([row])
     def undo():
-        if descriptor in county.descriptors:
-            county.descriptors.remove(descriptor)
-            county.recalculate = True
-        else:
-            county.descriptors.append(descriptor)
-            county.recalculate = True
+        membership.toggle(row, descriptor.row)
+        predictions.restore([row], saved)
+        score_counties([row])
     return Change(undo)
-    
 
-top_score: int = 0
-counties_scores = {county: 0.0 for county in counties}    
-def score_county(county: County) -> float:
-    county_score = compare_demographics(county.demographics, county.descriptor_demographics(), "l1")
-    counties_scores[county] = county_score
-    return county_score
+_moves = cycle([permute_descriptors, permute_counties])
+def permute() -> Change | None:
+    ''' Change a descriptor's effects or a county's descriptors, in turn. '''
+    return next(_moves)()
+
+counties_scores: ScoreTable = ScoreTable(0) # Score of the county in each row, filled by initialize
+
+engine: ScoringEngine | None = None
+membership: Membership | None = None # Descriptors assigned to each county during a run: see sync_descriptors
+predictions: Predictions | None = None # Predicted demographics of each county, from the membership and effects
+def observed_demographics() -> Tuple[np.ndarray, np.ndarray | None, np.ndarray | None]:
+    ''' The counties' demographics for the scoring engine, with the row of each county and the column of each
+        demographic in them (None if in order). Counties read from the county data are scored against its
+        memory-mapped matrix, which every replica shares; otherwise, or if a descriptor has a demographic no county
+        has, their demographics are copied into a matrix. '''
+    if counties and isinstance(counties[0].demographics, DemographicsRow):
+        data = counties[0].demographics.data
+        if all(name in data.column_index for name in demographics) and all(isinstance(county.demographics, DemographicsRow) and county.demographics.data is data for county in counties):
+            rows = np.array([county.demographics.row for county in counties], dtype=np.int64)
+            columns = np.array([data.column_index[name] for name in demographics], dtype=np.int64)
+            if (columns == np.arange(len(columns))).all(): # In the county data's order, as reading every county leaves them
+                return data.observed[:, :len(columns)], rows, None
+            return data.observed, rows, columns
+    return demographics_matrix([county.demographics for county in counties], demographics), None, None
+
+def build_engine():
+    ''' Give the scoring engine the counties' demographics (see observed_demographics) and the descriptors'
+        effect table, which it shares, and arrange the counties' descriptors as a membership matrix. Counties
+        are in the order of counties.
+        Build again after making more descriptors or demographics. '''
+    global engine, membership, predictions, counties_scores
+    observed, rows, columns = observed_demographics()
+    engine = ScoringEngine(observed, effect_table.matrix(), "l1", empty_score=0.0, rows=rows, columns=columns) # A county with no predicted demographics scores 0
+    membership = Membership(len(counties), effect_table.rows)
+    counties_scores = ScoreTable(len(counties))
+    predictions = Predictions(len(counties), lambda rows: membership.product(engine.effects, rows))
+    for row, county in enumerate(counties):
+        for descriptor in county.descriptors:
+            membership.add(row, descriptor.row)
+
+def sync_descriptors():
+    ''' Copy the descriptors assigned in the membership matrix back to each county's list of descriptors. '''
+    for row, county in enumerate(counties):
+        county.descriptors = [descriptors_by_row[column] for column in membership.columns(row)]
+        county.recalculate = True
+
+def score_counties(rows: Sequence[int]):
+    ''' Score the counties in rows together with the scoring engine, and cache their scores. '''
+    if not len(rows):
+        return
+    counties_scores.update(rows, engine.scores(rows, predictions[rows]))
 
 def score() -> float:
-    if not counties_scores:
-        return 0.0
-    avg_score = sum(counties_scores.values()) / len(counties_scores)
-    return avg_score
-
-def run():
-    prev_score = 0
-    while True:
-        change = permute_descriptors()
-        new_score = score()
-        if change and prev_score > new_score:
-            change.undo()
-            # print("Undone!")
-        else:
-            prev_score = new_score
-            print(new_score)
-
-        change = permute_counties()
-        new_score = score()
-        if change and prev_score > new_score:
-            change.undo()
-        else:
-            prev_score = new_score
-            print(new_score)
-
-def write_output():
-    os.makedirs("logs", exist_ok=True)
-    with open("logs\\log.out",'w',encoding='utf-8') as out:
-        for county in counties:
-            out.write(f"{county.name}, {county.state}: {[d.name for d in county.descriptors]}\n")
-        for descriptor in descriptors:
-            out.write(str(descriptor) + "\n")
-
-def main() -> None:
+    return counties_scores.average()
+
+def run(annealer: Annealer | None = None, steps: int | None = None, seconds: float | None = None) -> float:
+    ''' Anneal for a number of steps or seconds, or until interrupted, printing statistics for each phase.
+        Returns the best score reached. '''
+    annealer = Annealer(permute, score, make_schedule("adaptive")) if annealer is None else annealer
+    return annealer.run(steps, seconds)
+
+def result() -> Dict[str, Any]:
+    ''' The score, the descriptors of each county and every descriptor, as plain data which can be sent between
+        processes. '''
+    sync_descriptors()
+    return {"score": score(),
+            "assignments": [(county.name, county.state, [d.name for d in county.descriptors]) for county in counties],
+            "descriptors": [str(descriptor) for descriptor in descriptors]}
+
+def write_output(output: Dict[str, Any] | None = None, path: str = "logs\\log.out"):
+    ''' Write a result (this run's, by default) to a log. '''
+    output = result() if output is None else output
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path,'w',encoding='utf-8') as out:
+        for name, state, names in output["assignments"]:
+            out.write(f"{name}, {state}: {names}\n")
+        for descriptor in output["descriptors"]:
+            out.write(descriptor + "\n")
+
+def main(dataset: Dataset | None = None, annealer: Annealer | None = None, steps: int | None = None, seconds: float | None = None) -> None:
+    read_counties(dataset)
+    initialize()
     try:
-        initialize()
-        run()
+        run(annealer, steps, seconds)
     except KeyboardInterrupt:
-        write_output()
+        pass
+    write_output()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Assign descriptors to counties")
+    add_arguments(parser)
+    add_schedule_arguments(parser)
+    args = parser.parse_args()
+    main(from_arguments(args), annealer_from_arguments(args, permute, score), args.steps, args.seconds)
\ No newline at end of file
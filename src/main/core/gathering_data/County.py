@@ -5,9 +5,10 @@ from Paths import ROOT_URL
 from MapEntity import MapEntity
 
 class County(MapEntity):
-    def __init__(self, name: str, population: int, demographics: Dict[str, Dict[str, Any]], state: State):
+    def __init__(self, name: str, population: int, demographics: Dict[str, Dict[str, Any]], state: State, fips: str = ""):
         super().__init__(name, population, demographics)
         self.state = state
+        self.fips = fips
 
     def __str__(self) -> str:
         return f"County: {super().__str__()}, state: {self.state.name}"
@@ -21,6 +22,9 @@ class County(MapEntity):
     def to_json(self) -> Dict[str, Any]:
         result = {}
         result['name'] = self.name
+        result['state'] = self.state.name
+        if self.fips:
+            result['FIPS'] = self.fips
         result['population'] = self.population
         result['demographics'] = self.demographics
         return result
\ No newline at end of file
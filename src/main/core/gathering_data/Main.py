@@ -1,25 +1,46 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple, Any
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import os
 import json
 import time
 
 from Paths import *
-from page_reader import get_soup, identify_states, identify_counties
-from MapEntityFactory import create_state_from_files, create_county_from_files, create_nation_from_files
-
-def webpages_to_files():
-    ''' Read state data into files in resources\\data for quicker access later. '''
+from page_reader import identify_states, identify_counties, set_rate_limit, REQUESTS_PER_SECOND
+from crawler import crawl, WORKERS, COMPRESSION
+from crawl_manifest import CrawlManifest
+from page_files import read_page
+from MapEntityFactory import create_state_from_files, create_county_from_files, create_nation_from_files, hash_input_files
+from build_record import BuildRecord
+from State import State
+from gazetteer import get_gazetteer
+
+def discover_links(manifest: CrawlManifest, url: str, kind: str, refresh: bool = False) -> List[str]:
+    ''' Get the state or county links on a page, from the manifest if it has already been searched. '''
+    links = None if refresh else manifest.links(url, kind)
+    if links is None:
+        links = sorted(identify_states(url) if kind == "state" else identify_counties(url))
+        manifest.add_links(url, kind, links)
+    return links
+
+def webpages_to_files(workers: int = WORKERS, requests_per_second: float = REQUESTS_PER_SECOND, refresh: bool = False, compression: str = COMPRESSION):
+    ''' Read state data into files in resources\\data for quicker access later. Pages are fetched by a pool
+        of workers, sharing a per-host rate limit of requests_per_second, and saved as received (gzip or zstd
+        compressed if requested). Progress is kept in the crawl manifest, so a restarted crawl skips link discovery
+        and pages already fetched. When refreshing, links are rediscovered and every page is re-requested
+        conditionally, so only changed pages are downloaded. '''
 
     pages = ["Race-and-Ethnicity", "Age-and-Sex", "Household-Types", "Marital-Status", "Ancestry", "Household-Income", "Employment-Status", "Industries", "Educational-Attainment"]
 
+    set_rate_limit(requests_per_second)
+    manifest = CrawlManifest(MANIFEST_FILE)
+    failed: List[Tuple[str, str]] = []
+
     # Read and write nation data
-    for page in pages:
-        soup = get_soup("https://statisticalatlas.com/United-States/" + page)
-        with open(DATA_DIR + "\\" + page + ".html", 'w', encoding='utf-8') as out:
-            out.write(soup.prettify())
+    failed += crawl([("https://statisticalatlas.com/United-States/" + page, DATA_DIR + "\\" + page + ".html") for page in pages], workers, refresh, compression, manifest)
 
     # Identify States and write files
-    states_links = identify_states("https://statisticalatlas.com/United-States/Overview")
+    states_links = discover_links(manifest, NATION_URL, "state", refresh)
     for link in states_links:
         state_page_name = link.split("/")[-2]
         state_file_name = state_page_name.replace("-","_").lower()
@@ -39,27 +60,14 @@ def webpages_to_files():
         except OSError as e:
             print(str(e))
 
+        jobs: List[Tuple[str, str]] = []
         for page in pages:
-            if not os.path.exists(state_folder + "\\" + page + ".html"):
-                soup = get_soup(link.replace("Overview", page))
-                with open(state_folder + "\\" + page + ".html", 'w', encoding='utf-8') as out:
-                    out.write(soup.prettify())
-
-        # state_tasks = []
-        # with ThreadPoolExecutor(max_workers=1) as executor:
-        #     for page in pages:
-        #         filepath = state_folder + "\\" + page + ".html"
-        #         if not os.path.exists(filepath):
-        #             url = link.replace("Overview", page)
-        #             state_tasks.append(executor.submit(fetch_and_save, url, filepath))
-        #     for future in as_completed(state_tasks):
-        #         future.result()
-
-        counties_links = identify_counties(link)
+            jobs.append((link.replace("Overview", page), state_folder + "\\" + page + ".html"))
+
+        counties_links = discover_links(manifest, link, "county", refresh)
         for c_link in counties_links:
             county_page_name = c_link.split("/")[-2]
             county_file_name = county_page_name.replace("-","_").lower()
-            print(county_file_name)
 
             county_folder = state_folder + "\\counties\\" + county_file_name
             try:
@@ -69,20 +77,15 @@ def webpages_to_files():
             except OSError as e:
                 print(str(e))
 
-            # county_tasks = []
-            # for page in pages:
-            #     filepath = county_folder + "\\" + page + ".html"
-            #     if not os.path.exists(filepath):
-            #         url = c_link.replace("Overview", page)
-            #         county_tasks.append(executor.submit(fetch_and_save, url, filepath))
-            # for future in as_completed(county_tasks):
-            #     future.result()
-
             for page in pages:
-                if not os.path.exists(county_folder + "\\" + page + ".html"):
-                    c_soup = get_soup(c_link.replace("Overview", page))
-                    with open(county_folder + "\\" + page + ".html", 'w', encoding='utf-8') as out:
-                        out.write(c_soup.prettify())
+                jobs.append((c_link.replace("Overview", page), county_folder + "\\" + page + ".html"))
+
+        failed += crawl(jobs, workers, refresh, compression, manifest)
+
+    manifest.close()
+    print("Pages which could not be fetched:")
+    for url, _ in failed:
+        print(url)
 
 def combine_jsons():
 
@@ -112,37 +115,134 @@ def combine_jsons():
 def list_states() -> List[str]:
     return [state for state in os.listdir(DATA_DIR) if "." not in state]
 
-def convert_html_json_files():
-    if not os.path.exists(f"{RESOURCES_DIR}\\nation.json"):
+def state_fips(state_name: str) -> str | None:
+    ''' Get the FIPS code of a state from its folder name. '''
+    return get_gazetteer().state_fips(state_name)
+
+def county_fips(state_name: str, county_name: str) -> str | None:
+    ''' Get the FIPS code of a county from its state and county folder names. '''
+    return get_gazetteer().county_fips(county_name, state_name)
+
+# Fields every state and county json file must have
+REQUIRED_FIELDS = ["name", "FIPS", "population", "demographics"]
+REQUIRED_DEMOGRAPHICS = ["race_and_ethnicity", "age_and_sex", "household_types", "marital_status", "employment_status", "industries", "educational_attainment"]
+
+def missing_fields(data: Dict[str, Any]) -> List[str]:
+    ''' Get the required fields missing from a state or county's json data. '''
+    missing = [field for field in REQUIRED_FIELDS if field not in data]
+    missing += [field for field in REQUIRED_DEMOGRAPHICS if field not in data.get("demographics", {})]
+    return missing
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    with open(path,'w',encoding='utf-8') as out:
+        out.write(json.dumps(data, indent=4, separators=(", "," : ")))
+
+def write_entity_json(path: str, data: Dict[str, Any]) -> None:
+    ''' Write a state or county json file, reporting it if required fields are missing. '''
+    missing = missing_fields(data)
+    if missing:
+        print(f"{path} is BAD, missing {missing} ------------------------------")
+    write_json(path, data)
+
+def convert_state(state_name: str, path: str, recorded_hash: str | None = None) -> Tuple[State, str | None]:
+    ''' Create a state from its files, writing its json file to path unless it was already built from the same pages.
+        Returns the state, and the hash of its pages if its json file was written. '''
+    state = create_state_from_files(state_name, state_fips(state_name) or "")
+    input_hash = hash_input_files(state_name)
+    if input_hash == recorded_hash and os.path.exists(path):
+        return state, None
+    write_entity_json(path, state.to_json())
+    return state, input_hash
+
+# States shared with each conversion process, set once per process by share_states
+_states: Dict[str, State] = {}
+def share_states(states: Dict[str, State]) -> None:
+    global _states
+    _states = states
+
+def convert_county(state_name: str, county_name: str, path: str, recorded_hash: str | None = None) -> str | None:
+    ''' Create a county from its files and write its json file to path, unless it was already built from the same pages.
+        Returns the hash of its pages if its json file was written. '''
+    input_hash = hash_input_files(state_name, county_name)
+    if input_hash == recorded_hash and os.path.exists(path):
+        return None
+    county = create_county_from_files(state_name, county_name, _states[state_name], county_fips(state_name, county_name) or "")
+    write_entity_json(path, county.to_json())
+    return input_hash
+
+def convert_html_json_files(workers: int = 1):
+    ''' Convert the downloaded pages into json files. Each state and county json file is written once, complete with
+        its state and FIPS code, and named by its FIPS code. Only json files whose pages changed since they were last
+        built (by content hash, kept in the build record) are rebuilt. States, then counties, are converted by a pool
+        of worker processes; each worker receives the finished states once, rather than with every county. Output does
+        not depend on the number of workers. '''
+    build_record = BuildRecord(BUILD_RECORD_FILE)
+    recorded = build_record.hashes()
+
+    nation_path = f"{RESOURCES_DIR}\\nation.json"
+    nation_hash = hash_input_files()
+    if nation_hash != recorded.get(nation_path) or not os.path.exists(nation_path):
         print("NATION ===========================")
         nation = create_nation_from_files()
-        with open(f"{RESOURCES_DIR}\\nation.json",'w',encoding='utf-8') as out:
-            nation_json = nation.to_json()
-            out.write(json.dumps(nation_json, indent=4, separators=(", "," : ")))
-
-    for state_name in os.listdir(f"{DATA_DIR}"):
-        if '.' not in state_name:
-            print(state_name + " ------------------------------")
-            state = create_state_from_files(state_name)
-            if not os.path.exists(f"{RESOURCES_DIR}\\{state_name}\\{state_name}.json"):
-                try:
-                    os.mkdir(f"{RESOURCES_DIR}\\{state_name}")
-                except OSError:
-                    pass
-                with open(f"{RESOURCES_DIR}\\{state_name}\\{state_name}.json",'w',encoding='utf-8') as out:
-                    state_json = state.to_json()
-                    out.write(json.dumps(state_json, indent=4, separators=(", "," : ")))
-            for county_name in os.listdir(f"{DATA_DIR}\\{state_name}\\counties"):
-                if not "." in county_name and not os.path.exists(f"{RESOURCES_DIR}\\{state_name}\\counties\\{county_name}.json"):
-                    print(county_name)
-                    county = create_county_from_files(state_name, county_name, state)
-                    try:
-                        os.mkdir(f"{RESOURCES_DIR}\\{state_name}\\counties")
-                    except OSError:
-                        pass
-                    with open(f"{RESOURCES_DIR}\\{state_name}\\counties\\{county_name}.json",'w',encoding='utf-8') as out:
-                        county_json = county.to_json()
-                        out.write(json.dumps(county_json, indent=4, separators=(", "," : ")))
+        write_json(nation_path, nation.to_json())
+        build_record.record(nation_path, nation_hash)
+
+    state_names: List[str] = []
+    for state_name in sorted(state_name for state_name in os.listdir(f"{DATA_DIR}") if '.' not in state_name):
+        if state_fips(state_name) is None:
+            print(f"No FIPS code for {state_name}, skipping")
+            continue
+        state_names.append(state_name)
+        os.makedirs(f"{RESOURCES_DIR}\\{state_name}\\counties", exist_ok=True)
+    state_paths = [f"{RESOURCES_DIR}\\{state_name}\\{state_fips(state_name)}.json" for state_name in state_names]
+
+    county_jobs: List[Tuple[str, str, str]] = []
+    sources: Dict[str, str] = {} # FIPS -> county folder it is built from
+    for state_name in state_names:
+        for county_name in sorted(os.listdir(f"{DATA_DIR}\\{state_name}\\counties")):
+            if "." in county_name:
+                continue
+            code = county_fips(state_name, county_name)
+            if code is None:
+                print(f"No FIPS code for {county_name}, {state_name}, skipping")
+                continue
+            # Two folders for one county would overwrite each other's json file
+            if code in sources:
+                raise ValueError(f"{county_name}, {state_name} and {sources[code]} are both county {code}")
+            sources[code] = f"{county_name}, {state_name}"
+            county_jobs.append((state_name, county_name, f"{RESOURCES_DIR}\\{state_name}\\counties\\{code}.json"))
+    county_paths = [path for _, _, path in county_jobs]
+
+    if workers <= 1:
+        state_results = [convert_state(state_name, path, recorded.get(path)) for state_name, path in zip(state_names, state_paths)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            state_results = list(executor.map(convert_state, state_names, state_paths, [recorded.get(path) for path in state_paths]))
+    states: Dict[str, State] = {}
+    for state_name, path, (state, input_hash) in zip(state_names, state_paths, state_results):
+        states[state_name] = state
+        if input_hash is not None:
+            print(path)
+            build_record.record(path, input_hash)
+
+    def record_counties(results):
+        rebuilt = 0
+        for path, input_hash in zip(county_paths, results):
+            if input_hash is not None:
+                print(path)
+                build_record.record(path, input_hash)
+                rebuilt += 1
+        print(f"{rebuilt} of {len(county_paths)} counties rebuilt")
+
+    recorded_hashes = [recorded.get(path) for path in county_paths]
+    if workers <= 1 or not county_jobs:
+        share_states(states)
+        record_counties(convert_county(state_name, county_name, path, recorded_hash) for (state_name, county_name, path), recorded_hash in zip(county_jobs, recorded_hashes))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=share_states, initargs=(states,)) as executor:
+            state_args, county_args, path_args = zip(*county_jobs)
+            record_counties(executor.map(convert_county, state_args, county_args, path_args, recorded_hashes, chunksize=8))
+    build_record.close()
 
 def count_counties():
     for state_name in [_ for _ in os.listdir(f"{RESOURCES_DIR}") if '.' not in _]:
@@ -152,47 +252,56 @@ def count_counties():
 unremovable_files: List[str] = []
 def verify_data():
     global unremovable_files
-    ''' Deletes all data files which contain a rate limit message. '''
+    ''' Deletes all data files which contain a rate limit message. Files the crawl manifest records as valid, at
+        the recorded size, are trusted without being read. Removed or missing files are marked invalid in the
+        manifest, so the next crawl fetches them again. '''
+    manifest = CrawlManifest(MANIFEST_FILE) if os.path.exists(MANIFEST_FILE) else None
+    recorded = manifest.pages() if manifest else {}
     for file in list_files_recursive(DATA_DIR):
+        page = recorded.get(file)
+        if page and page["valid"] and page["size"] == os.path.getsize(file):
+            continue
         print("Verifying: " + file)
         remove_file = False
-        with open(file) as data:
-            if "Too many requests" in data.readline():
-                print("BAD FILE: " + file)
-                remove_file = True
+        if b"Too many requests" in read_page(file)[:1000]:
+            print("BAD FILE: " + file)
+            remove_file = True
         if remove_file:
             for _ in range(10):
                 try:
                     os.chmod(file, 0o777)
                     os.remove(file)
                     print("REMOVED: " + file)
+                    if manifest:
+                        manifest.invalidate(file)
+                        recorded.pop(file, None)
                     break
                 except PermissionError:
                     time.sleep(0.1)
             else:
                 print("UNABLE TO REMOVE: " + file)
                 unremovable_files.append(file)
+    if manifest:
+        for file, page in recorded.items():
+            if page["valid"] and not os.path.exists(file):
+                print("MISSING: " + file)
+                manifest.invalidate(file)
+        manifest.close()
     print("Files which could not be removed:")
     for file in unremovable_files:
         print(file)
 
 def validate_json():
-    ''' Check that all json data files contian the necessary objects. '''
+    ''' Check that all state and county json data files contain the necessary objects. '''
     bad_files: List[str] = []
-    required_lines = ["name", "FIPS", "population", "demographics", "race_and_ethnicity", "age_and_sex", "household_types", "marital_status", "employment_status", "industries", "educational_attainment"]
     for file in list_files_recursive(RESOURCES_DIR):
-        has_required: List[bool] = [False for _ in required_lines]
-        content: List[str] = []
+        if file == f"{RESOURCES_DIR}\\nation.json" or not file.endswith(".json"):
+            continue
         with open(file, 'r', encoding='utf-8') as data:
-            content = data.readlines()
-        for i, required_line in enumerate(required_lines):
-            for line in content[i:]:
-                if required_line in line:
-                    has_required[i] = True
-                    break
-        if False in has_required:
+            missing = missing_fields(json.load(data))
+        if missing:
             bad_files.append(file)
-            print(f"{file} is BAD ------------------------------")
+            print(f"{file} is BAD, missing {missing} ------------------------------")
         else:
             print(f"{file} is good")
     print("Bad files:")
@@ -210,154 +319,7 @@ def list_files_recursive(root_dir: str, files = None) -> List[str]:
                 files.append(file)
     return files
 
-def add_states_to_jsons():
-    for state_dir in os.listdir(RESOURCES_DIR):
-        if '.' in state_dir:
-            continue
-        state_name = state_dir.replace("_"," ").title()
-        for county_file in os.listdir(f"{RESOURCES_DIR}\\{state_dir}\\counties"):
-            content: List[str] = []
-            with open(f"{RESOURCES_DIR}\\{state_dir}\\counties\\{county_file}",'r') as data:
-                content = data.readlines()
-            if "\"state\"" in "\n".join(content):
-                continue
-            for i, line in enumerate(content):
-                if "\"name\"" in line:
-                    content.insert(i+1, f"\t\"state\" : \"{state_name}\", \n")
-                    break
-            with open(f"{RESOURCES_DIR}\\{state_dir}\\counties\\{county_file}","w") as data:
-                for line in content:
-                    data.write(line)
-
-def add_fips_to_jsons():
-
-    fips: Dict[str, str] = {}
-    with open("src/main/core/gathering_data/counties.json",'r',encoding='utf-8') as c:
-        counties_lines = c.readlines()
-    for i, line in enumerate(counties_lines[1:]):
-        if "{" in line:
-            name = line.split(":")[0].replace("\"",'').replace(".",'').strip().title().replace("ö","o")
-            code = counties_lines[1:][i+2].split(":")[1].replace("\"",'').replace(",",'').strip()
-            fips[name] = code
-    with open("src/main/core/gathering_data/state_fips.txt",'r',encoding='utf-8') as s:
-        states_lines = s.readlines()
-    for line in states_lines:
-        name = line.split(" ")[0].title().replace("_"," ").strip()
-        code = line.split(" ")[1].strip()
-        fips[name] = code
-
-    special = {
-        "Anchorage Municipality" : "Municipality Of Anchorage",
-        "Hoonah Angoon Census Area" : "Hoonah-Angoon Census Area",
-        "Juneau City And Borough" : "City And Borough Of Juneau",
-        "Matanuska Susitna Borough" : "Matanuska-Susitna Borough",
-        "Prince Of Wales Hyder Census Area" : "Prince Of Wales-Hyder Census Area",
-        "Sitka City And Borough" : "City And Borough Of Sitka",
-        "Skagway Municipality" : "Municipality And Borough Of Skagway",
-        "Valdez Cordova Census Area" : "Chugach Census Area",
-        "Wrangell City And Borough" : "City And Borough Of Wrangell",
-        "Yakutat City And Borough" : "City And Borough Of Yakutat",
-        "Yukon Koyukuk Census Area" : "Yukon-Koyukuk Census Area",
-        "Miami Dade County" : "Miami-Dade County",
-        "De Witt County" : "Dewitt County",
-        "Obrien County" : "O'Brien County",
-        "De Soto Parish" : "Desoto Parish",
-        "Baltimore City" : "Baltimore Independent City",
-        "Prince Georges County" : "Prince George'S County",
-        "Queen Annes County" : "Queen Anne'S County",
-        "St Marys County" : "St Mary'S County",
-        "St Louis City" : "St Louis Independent City",
-        "Carson City" : "Carson Independent City",
-        "Doã±A Ana County" : "Doña Ana County",
-        "Le Flore County" : "Leflore County",
-        "Alexandria City" : "Alexandria Independent City",
-        "Bristol City" : "Bristol Independent City",
-        "Buena Vista City" : "Buena Vista Independent City",
-        "Charlottesville City" : "Charlottesville Independent City",
-        "Chesapeake City" : "Chesapeake Independent City",
-        "Colonial Heights City" : "Colonial Heights Independent City",
-        "Covington City" : "Covington Independent City",
-        "Colonial Heights City" : "Colonial Heights Independent City",
-        "Danville City" : "Danville Independent City",
-        "Emporia City" : "Emporia Independent City",
-        "Fairfax City" : "Fairfax Independent City",
-        "Falls Church City" : "Falls Church Independent City",
-        "Franklin City" : "Franklin Independent City",
-        "Fredericksburg City" : "Fredericksburg Independent City",
-        "Galax City" : "Galax Independent City",
-        "Hampton City" : "Hampton Independent City",
-        "Hampton City" : "Hampton Independent City",
-        "Harrisonburg City" : "Harrisonburg Independent City",
-        "Hopewell City" : "Hopewell Independent City",
-        "Lexington City" : "Lexington Independent City",
-        "Lynchburg City" : "Lynchburg Independent City",
-        "Manassas City" : "Manassas Independent City",
-        "Manassas Park City" : "Manassas Park Independent City",
-        "Martinsville City" : "Martinsville Independent City",
-        "Newport News City" : "Newport News Independent City",
-        "Norfolk City" : "Norfolk Independent City",
-        "Norton City" : "Norton Independent City",
-        "Petersburg City" : "Petersburg Independent City",
-        "Poquoson City" : "Poquoson Independent City",
-        "Portsmouth City" : "Portsmouth Independent City",
-        "Radford City" : "Radford Independent City",
-        "Richmond City" : "Richmond Independent City",
-        "Roanoke City" : "Roanoke Independent City",
-        "Salem City" : "Salem Independent City",
-        "Staunton City" : "Staunton Independent City",
-        "Suffolk City" : "Suffolk Independent City",
-        "Virginia Beach City" : "Virginia Beach Independent City",
-        "Waynesboro City" : "Waynesboro Independent City",
-        "Williamsburg City" : "Williamsburg Independent City",
-        "Winchester City" : "Winchester Independent City",
-    }
-
-    data_files = list_files_recursive(RESOURCES_DIR);
-    for data_file in data_files:
-        state_name = data_file.split("\\")[-3].replace("_"," ").title()
-        if state_name == "Main":
-            pass
-        elif state_name == "Resources":
-            state_name = data_file.split("\\")[-1].replace(".json",'').replace("_"," ").title()
-            code = fips[state_name]
-            with open(data_file,'r',encoding='utf-8') as data:
-                content = data.readlines()
-            content.insert(2, "\t\"FIPS\" : \"" + code + "\",\n")
-            with open(data_file,'w',encoding="utf-8") as out:
-                for line in content:
-                    out.write(line)
-        else:
-            county_name = data_file.split("\\")[-1].replace(".json",'').replace("_"," ").title()
-            if county_name in special:
-                county_name = special[county_name]
-            fullname = county_name + ", " + state_name
-            code = fips[fullname]
-            with open(data_file,'r',encoding='utf-8') as data:
-                content = data.readlines()
-            content.insert(3, "\t\"FIPS\" : \"" + code + "\",\n")
-            with open(data_file,'w',encoding="utf-8") as out:
-                for line in content:
-                    out.write(line)
-
-def rename_jsons_to_fips():
-    data_files = list_files_recursive(RESOURCES_DIR)
-    for data_file in data_files:
-        # Get FIPS code from file
-        code: str = ""
-        content: List[str] = []
-        with open(data_file, 'r', encoding='utf-8') as data:
-            content = data.readlines()
-        for line in content:
-            if 'FIPS' in line:
-                code = line.split(":")[-1].replace(",","").replace("\"","").strip()
-                break
-        if code:
-            path = "\\".join(data_file.split("\\")[:-1]) + "\\"
-            with open(path + code + ".json",'w',encoding='utf-8') as out:
-                for line in content:
-                    out.write(line)
-
-def main() -> None:
+def main(workers: int = 1) -> None:
 
     # Gather all webpages
     webpages_to_files()
@@ -365,23 +327,14 @@ def main() -> None:
     # Verify downloaded webpage files, and delete any invalid
     verify_data()
 
-    # Convert downloaded pages into json files
-    convert_html_json_files()
-
-    # Validate the json files
-    validate_json()
+    # Convert downloaded pages into json files, named by FIPS code and validated as they are written
+    convert_html_json_files(workers)
 
     # Count the counties in each state
     count_counties()
 
-    # Add state names to the json files
-    add_states_to_jsons()
-
-    # Add FIPS codes to the json files
-    add_fips_to_jsons()
-
-    # Generate files with FIPS codes as names
-    rename_jsons_to_fips()
-
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gather statistics pages and convert them into json files.")
+    parser.add_argument("--workers", type=int, default=1, help="processes used to convert pages into json files (default: 1)")
+    args = parser.parse_args()
+    main(args.workers)
\ No newline at end of file
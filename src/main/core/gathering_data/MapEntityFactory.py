@@ -1,8 +1,16 @@
-from typing import List, Dict, Set, Tuple, Any
-from bs4 import BeautifulSoup, Tag
+from typing import List, Dict, Tuple, Any
+from bs4 import BeautifulSoup, SoupStrainer, Tag, PageElement
+import hashlib
 import os
 
+try:
+    import lxml # Optional: a faster parser backend for BeautifulSoup
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
 from Paths import DATA_DIR
+from page_files import read_page, find_page
 from NumberOperations import formatted_number_to_int, percent_to_float
 from MapEntity import MapEntity
 from State import State
@@ -72,17 +80,15 @@ def create_county(soup: BeautifulSoup, county_name: str, state: State) -> County
 def create_nation_from_files() -> MapEntity:
     ''' Create the nation from its statistics files in DATA_DIR. '''
     name = "United States"
-    population = get_population(BeautifulSoup(open(nation_html_file("Age-and-Sex")).read(), features="html.parser"))
-    demographics = create_national_demographics_from_files()
+    population, demographics = extract_from_files()
     nation = MapEntity(name, population, demographics)
     return nation
 
-def create_state_from_files(state_name: str) -> State:
+def create_state_from_files(state_name: str, fips: str = "") -> State:
     ''' Create one state from its statistics files in DATA_DIR. '''
     name = state_name.replace("_"," ").title()
-    population = get_population(BeautifulSoup(open(state_html_file(state_name, "Age-and-Sex")).read(), features="html.parser"))
-    demographics = create_demographics_from_files(state_name)
-    state = State(name, population, demographics)
+    population, demographics = extract_from_files(state_name)
+    state = State(name, population, demographics, fips)
     return state
 
 def create_all_counties_from_files() -> Dict[State, List[County]]:
@@ -109,12 +115,11 @@ def create_all_counties_in_state_from_files(state_name, state: State | None = No
         print(county_name + " created")
     return counties
 
-def create_county_from_files(state_name: str, county_name: str, state: State) -> County:
+def create_county_from_files(state_name: str, county_name: str, state: State, fips: str = "") -> County:
     ''' Create one county from its statistics files in DATA_DIR. '''
     name = county_name.replace("_"," ").title()
-    population = get_population(BeautifulSoup(open(county_html_file(state_name, county_name, "Age-and-Sex")).read(), features="html.parser"))
-    demographics = create_demographics_from_files(state_name, county_name)
-    county = County(name, population, demographics, state)
+    population, demographics = extract_from_files(state_name, county_name)
+    county = County(name, population, demographics, state, fips)
     return county
 
 def get_population(soup: BeautifulSoup) -> int:
@@ -128,112 +133,95 @@ def get_population(soup: BeautifulSoup) -> int:
         print(str(e))
         return 0
 
-def create_national_demographics_from_files() -> Dict[str, Dict[str, Any]]:
-    
+# Page which the population is read from
+POPULATION_PAGE = "Age-and-Sex"
+
+# Demographics read from each page: (demographic, graphic names, inner categories). A demographic made of
+# several graphics (like ancestry) combines their statistics.
+PAGE_FIGURES: Dict[str, List[Tuple[str, List[str], List[str] | None]]] = {
+    "Race-and-Ethnicity" : [("race_and_ethnicity", ["race-and-ethnicity"], None)],
+    "Age-and-Sex" : [("age_and_sex", ["age-structure"], None)],
+    "Household-Types" : [("household_types", ["household-types"], None)],
+    "Marital-Status" : [("marital_status", ["detailed-marital-status"], ["female", "male"])],
+    "Ancestry" : [("ancestry", ["european-and-african-ancestry", "hispanic-ancestry", "asian-ancestry"], None)],
+    "Employment-Status" : [("employment_status", ["employment-status"], None)],
+    "Industries" : [("industries", ["industry"], None)],
+    "Educational-Attainment" : [("educational_attainment", ["detailed-educational-attainment"], None)],
+}
+
+# The only parts of a page the factory reads: the sidebar holding the population, and the figures
+FIGURES_ONLY = SoupStrainer(id=lambda value: value is not None and (value == "contents-nav" or value.startswith("figure/")))
+
+def parse_page(path: str, parser: str | None = None, parse_only: SoupStrainer | None = FIGURES_ONLY) -> BeautifulSoup:
+    ''' Parse a page file. By default only the sidebar and figures are built into the tree, using PARSER. '''
+    return BeautifulSoup(read_page(path), features=parser or PARSER, parse_only=parse_only)
+
+def html_file(data_file: str, state_name: str = "", county_name: str = "") -> str:
+    ''' Get the path to an HTML file for the nation, a state, or a county in a state. '''
+    if county_name:
+        return county_html_file(state_name, county_name, data_file)
+    if state_name:
+        return state_html_file(state_name, data_file)
+    return nation_html_file(data_file)
+
+def hash_input_files(state_name: str = "", county_name: str = "") -> str:
+    ''' Hash the contents of every page extract_from_files reads for the nation, a state, or a county. '''
+    digest = hashlib.sha256()
+    for page in PAGE_FIGURES:
+        path = find_page(html_file(page, state_name, county_name))
+        digest.update(page.encode('utf-8'))
+        if path is None:
+            digest.update(b"missing")
+            continue
+        with open(path, 'rb') as data:
+            digest.update(hashlib.sha256(data.read()).digest())
+    return digest.hexdigest()
+
+def extract_from_files(state_name: str = "", county_name: str = "") -> Tuple[int, Dict[str, Dict[str, Any]]]:
+    ''' Get the population and all demographics of the nation, a state, or a county from its files in DATA_DIR.
+        Each file is parsed exactly once, and every figure on it is read from that one parse. '''
+    population: int = 0
     demographics: Dict[str, Dict[str, Any]] = {}
-
-    soup = BeautifulSoup(open(nation_html_file("Race-and-Ethnicity")).read(), features="html.parser")
-    race_and_ethnicity = get_race_and_ethnicity(soup)
-    demographics["race_and_ethnicity"] = race_and_ethnicity
-
-    soup = BeautifulSoup(open(nation_html_file("Age-and-Sex")).read(), features="html.parser")
-    age_and_sex = get_age_and_sex(soup)
-    demographics["age_and_sex"] = age_and_sex
-
-    soup = BeautifulSoup(open(nation_html_file("Household-Types")).read(), features="html.parser")
-    household_types = get_household_types(soup)
-    demographics["household_types"] = household_types
-
-    soup = BeautifulSoup(open(nation_html_file("Marital-Status")).read(), features="html.parser")
-    marital_status = get_marital_status(soup)
-    demographics["marital_status"] = marital_status
-
-    soup = BeautifulSoup(open(nation_html_file("Ancestry")).read(), features="html.parser")
-    ancestry = get_ancestry(soup)
-    demographics["ancestry"] = ancestry
-
-    soup = BeautifulSoup(open(nation_html_file("Employment-Status")).read(), features="html.parser")
-    employment_status = get_employment_status(soup)
-    demographics["employment_status"] = employment_status
-
-    soup = BeautifulSoup(open(nation_html_file("Industries")).read(), features="html.parser")
-    industries = get_industries(soup)
-    demographics["industries"] = industries
-
-    soup = BeautifulSoup(open(nation_html_file("Educational-Attainment")).read(), features="html.parser")
-    educational_attainment = get_educational_attainment(soup)
-    demographics["educational_attainment"] = educational_attainment
-
+    for page, figures in PAGE_FIGURES.items():
+        soup = parse_page(html_file(page, state_name, county_name))
+        if page == POPULATION_PAGE:
+            population = get_population(soup)
+        demographics |= extract_figures(soup, figures)
+    return population, demographics
+
+def extract_figures(soup: BeautifulSoup, figures: List[Tuple[str, List[str], List[str] | None]]) -> Dict[str, Dict[str, Any]]:
+    ''' Read every listed demographic from a page. Demographics with a missing graphic are left out. '''
+    demographics: Dict[str, Dict[str, Any]] = {}
+    graphics = get_graphics(soup)
+    index = GraphicIndex(soup)
+    for demographic, graphic_names, inner_categories in figures:
+        try:
+            result: Dict[str, Any] = {}
+            for graphic_name in graphic_names:
+                result |= read_statistics(graphics[graphic_name], inner_categories, index)
+            demographics[demographic] = result
+        except KeyError as e:
+            print(f"Missing graphic {e} for {demographic}")
+        except IndexError:
+            pass
     return demographics
 
+def create_national_demographics_from_files() -> Dict[str, Dict[str, Any]]:
+    ''' Get all demographic details from files on the nation. '''
+    return extract_from_files()[1]
+
 def create_demographics_from_files(state_name: str, county_name: str = "") -> Dict[str, Dict[str, Any]]:
     ''' Get all demographic details from files on a state/county. '''
+    return extract_from_files(state_name, county_name)[1]
 
-    demographics: Dict[str, Dict[str, Any]] = {}
-
-    def file_function(state_name: str, county_name: str, file_name: str) -> str:
-        if county_name:
-            return county_html_file(state_name, county_name, file_name)
-        else:
-            return state_html_file(state_name, file_name)
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Race-and-Ethnicity")).read(), features="html.parser")
-        race_and_ethnicity = get_race_and_ethnicity(soup)
-        demographics["race_and_ethnicity"] = race_and_ethnicity
-    except IndexError:
-        pass
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Age-and-Sex")).read(), features="html.parser")
-        age_and_sex = get_age_and_sex(soup)
-        demographics["age_and_sex"] = age_and_sex
-    except IndexError:
-        pass
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Household-Types")).read(), features="html.parser")
-        household_types = get_household_types(soup)
-        demographics["household_types"] = household_types
-    except IndexError:
-        pass
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Marital-Status")).read(), features="html.parser")
-        marital_status = get_marital_status(soup)
-        demographics["marital_status"] = marital_status
-    except IndexError:
-        pass
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Ancestry")).read(), features="html.parser")
-        ancestry = get_ancestry(soup)
-        demographics["ancestry"] = ancestry
-    except IndexError:
-        pass
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Employment-Status")).read(), features="html.parser")
-        employment_status = get_employment_status(soup)
-        demographics["employment_status"] = employment_status
-    except IndexError:
-        pass
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Industries")).read(), features="html.parser")
-        industries = get_industries(soup)
-        demographics["industries"] = industries
-    except IndexError:
-        pass
-
-    try:
-        soup = BeautifulSoup(open(file_function(state_name, county_name, "Educational-Attainment")).read(), features="html.parser")
-        educational_attainment = get_educational_attainment(soup)
-        demographics["educational_attainment"] = educational_attainment
-    except IndexError:
-        pass
-
-    return demographics
+def get_graphics(soup: BeautifulSoup) -> Dict[str, Tag]:
+    ''' Get every figure's graphic on a page, keyed by graphic name, in one pass over the page. '''
+    graphics: Dict[str, Tag] = {}
+    for figure in soup.find_all(id=lambda value: value is not None and value.startswith("figure/")):
+        graphic = figure.select_one(":scope > div.figure-contents > svg > g")
+        if graphic is not None:
+            graphics.setdefault(figure["id"][len("figure/"):], graphic)
+    return graphics
 
 def get_graphic(soup: BeautifulSoup, selector: str) -> Tag :
     ''' Get the graphic from a page using its CSS selector. '''
@@ -250,23 +238,85 @@ def get_statistics_dictionary(soup: BeautifulSoup, graphic_name: str, inner_cate
     ''' Get a dictionary of statistics from a page using its graphic name. Inner categories will intelligently subdivide parsed information. '''
 
     selector = f"#figure\\/{graphic_name} > div.figure-contents > svg > g"    
-    graphics = get_graphic(soup, selector).select("g")
+    return read_statistics(get_graphic(soup, selector), inner_categories)
+
+class GraphicIndex:
+    ''' Everything read_statistics looks up, found in one walk over a page (or a single figure) instead of
+        searching the tree for every figure and every <g>: the <g> elements in order, which of them use the normal
+        font (font-style="normal" on itself or on any element inside it), and the first <title> inside each. '''
+
+    def __init__(self, root: Tag):
+        self.root: Tag = root
+        self.graphics: List[Tag] = [] # Every <g> inside root, in document order
+        self.normal: Dict[int, Tag] = {} # id of a normal font <g> -> the first normal font element inside it
+        self.titles: Dict[int, Tag] = {} # id of a <g> -> the first <title> inside it
+        self._positions: Dict[int, int] = {} # id of a <g> -> its index in graphics
+        graphics, positions = self.graphics, self._positions
+        for element in root.descendants:
+            name = element.name
+            if name is None:
+                continue # Text
+            if name == "g":
+                positions[id(element)] = len(graphics)
+                graphics.append(element)
+            elif name == "title":
+                self._mark_graphics(element, self.titles, element.parent)
+            if element.attrs.get("font-style") == "normal":
+                self._mark_graphics(element, self.normal, element)
+
+    def _mark_graphics(self, element: Tag, marks: Dict[int, Tag], node: Tag | None) -> None:
+        ''' Mark every <g> from node up to root with element, unless marked already. Stops at the first <g> marked
+            already, since every <g> above it was marked with it. '''
+        while node is not None and node is not self.root:
+            if node.name == "g":
+                if id(node) in marks:
+                    return
+                marks[id(node)] = element
+            node = node.parent
+
+    def _position_from(self, element: PageElement | None) -> int:
+        ''' The index in graphics of the first <g> at or after element in the document. '''
+        while element is not None:
+            position = self._positions.get(id(element))
+            if position is not None:
+                return position
+            element = element.next_element
+        return len(self.graphics)
+
+    def graphics_in(self, figure: Tag) -> List[Tag]:
+        ''' Every <g> inside figure, in document order: those in graphics from the first after figure's tag up to
+            the first after figure's last element. '''
+        if figure is self.root:
+            return self.graphics
+        node = figure
+        while node is not None and node.next_sibling is None:
+            node = node.parent
+        end = self._position_from(node.next_sibling) if node is not None else len(self.graphics)
+        return self.graphics[self._position_from(figure.next_element):end]
+
+def read_statistics(figure: Tag, inner_categories: List[str] | None = None, index: GraphicIndex | None = None) -> Dict[str, Any]:
+    ''' Get a dictionary of statistics from a figure's graphic. See get_statistics_dictionary. Pass the index of
+        the page holding the figure, when reading several figures of a page, to walk the page only once. '''
+
+    if index is None:
+        index = GraphicIndex(figure)
+    graphics = index.graphics_in(figure)
+    normal = index.normal
 
     first: int = 0 # The first usable graphic
 
-    for index, graphic in enumerate(graphics):
-        if "font-style=\"normal\"" in graphic.prettify():
-            first = index
+    for i, graphic in enumerate(graphics):
+        if id(graphic) in normal:
+            first = i
             break
 
     # Get label strings from graphics
     labels: List[str] = []
     for graphic in graphics[first:]:
-        if not "font-style=\"normal\"" in graphic.prettify():
+        if id(graphic) not in normal:
             break
-        label = graphic.get_text().strip()
-        if len(label.split("\n")) > 1:
-            label = label.split("\n")[0].strip()
+        # First line of the first string, which does not depend on how the page's whitespace was formatted
+        label = next(graphic.stripped_strings, "").split("\n")[0].strip()
         if label:
             labels.append(label)
 
@@ -280,7 +330,10 @@ def get_statistics_dictionary(soup: BeautifulSoup, graphic_name: str, inner_cate
         if len(values) >= len(labels) * values_per_label:
             break
         try:
-            value = graphic.find_all("title")[0].get_text().strip()
+            title = index.titles.get(id(graphic))
+            if title is None:
+                raise IndexError("graphic has no title")
+            value = title.get_text().strip()
             if '%' in value:
                 value = percent_to_float(value)
                 values.append(value if value else 0.0)
@@ -341,12 +394,11 @@ def get_marital_status(soup: BeautifulSoup) -> Dict[str, Dict[str, float]]:
 def get_ancestry(soup: BeautifulSoup) -> Dict[str, float]:
 
     # European and African Ancestry, Hispanic Ancestry, and Asian Ancestry are listed separately.
-    european_graphic = "european-and-african-ancestry"
-    european: Dict[str, float] = get_statistics_dictionary(soup, european_graphic)
-    hispanic_graphic = "hispanic-ancestry"
-    hispanic: Dict[str, float] = get_statistics_dictionary(soup, hispanic_graphic)
-    asian_graphic = "asian-ancestry"
-    asian: Dict[str, float] = get_statistics_dictionary(soup, asian_graphic)
+    graphics = get_graphics(soup)
+    index = GraphicIndex(soup)
+    european: Dict[str, float] = read_statistics(graphics["european-and-african-ancestry"], index=index)
+    hispanic: Dict[str, float] = read_statistics(graphics["hispanic-ancestry"], index=index)
+    asian: Dict[str, float] = read_statistics(graphics["asian-ancestry"], index=index)
 
     result: Dict[str, float] = european | hispanic | asian
 
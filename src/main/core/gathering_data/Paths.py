@@ -1,4 +1,7 @@
 ROOT_URL: str = 'https://statisticalatlas.com'
 NATION_URL: str = ROOT_URL + '/United-States/Overview'
 DATA_DIR = "D:\\data"
+CACHE_DIR = "D:\\http_cache" # Kept outside DATA_DIR, whose folders are all read as states
+MANIFEST_FILE = "D:\\crawl_manifest.db"
+BUILD_RECORD_FILE = "D:\\build_record.db"
 RESOURCES_DIR = "src\\main\\resources"
\ No newline at end of file
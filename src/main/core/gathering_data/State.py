@@ -4,8 +4,9 @@ from Paths import ROOT_URL
 from MapEntity import MapEntity
 
 class State(MapEntity):
-    def __init__(self, name: str, population: int, demographics: Dict[str, Dict[str, Any]]):
+    def __init__(self, name: str, population: int, demographics: Dict[str, Dict[str, Any]], fips: str = ""):
         super().__init__(name, population, demographics)
+        self.fips = fips
 
     def __str__(self) -> str:
         return f"State: {super().__str__()}"
@@ -13,6 +14,8 @@ class State(MapEntity):
     def to_json(self) -> Dict[str, Any]:
         result = {}
         result['name'] = self.name
+        if self.fips:
+            result['FIPS'] = self.fips
         result['population'] = self.population
         result['demographics'] = self.demographics
         return result
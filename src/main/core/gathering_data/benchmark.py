@@ -0,0 +1,147 @@
+from typing import List, Dict, Tuple, Any, Callable
+from bs4 import BeautifulSoup, Tag
+import os
+import sys
+import time
+
+from Paths import DATA_DIR
+from page_files import read_page
+from MapEntityFactory import county_html_file, extract_from_files, parse_page, PAGE_FIGURES, PARSER, FIGURES_ONLY, get_population, get_statistics_dictionary, \
+    get_graphics, GraphicIndex, read_statistics, get_race_and_ethnicity, get_age_and_sex, get_household_types, get_marital_status, get_employment_status, \
+    get_industries, get_educational_attainment
+
+def parse_per_figure(state_name: str, county_name: str) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+    ''' Read a county the way the factory used to: a fresh parse for the population and for each demographic,
+        and one selector pass per ancestry graphic. Kept as the baseline for benchmarks. '''
+    def soup(page: str) -> BeautifulSoup:
+        return BeautifulSoup(read_page(county_html_file(state_name, county_name, page)), features="html.parser")
+    population = get_population(soup("Age-and-Sex"))
+    demographics: Dict[str, Dict[str, Any]] = {}
+    demographics["race_and_ethnicity"] = get_race_and_ethnicity(soup("Race-and-Ethnicity"))
+    demographics["age_and_sex"] = get_age_and_sex(soup("Age-and-Sex"))
+    demographics["household_types"] = get_household_types(soup("Household-Types"))
+    demographics["marital_status"] = get_marital_status(soup("Marital-Status"))
+    ancestry = soup("Ancestry")
+    demographics["ancestry"] = get_statistics_dictionary(ancestry, "european-and-african-ancestry") | \
+        get_statistics_dictionary(ancestry, "hispanic-ancestry") | get_statistics_dictionary(ancestry, "asian-ancestry")
+    demographics["employment_status"] = get_employment_status(soup("Employment-Status"))
+    demographics["industries"] = get_industries(soup("Industries"))
+    demographics["educational_attainment"] = get_educational_attainment(soup("Educational-Attainment"))
+    return population, demographics
+
+def list_counties(limit: int) -> List[Tuple[str, str]]:
+    ''' Get up to limit (state, county) names with files in DATA_DIR. '''
+    counties: List[Tuple[str, str]] = []
+    for state_name in sorted(os.listdir(DATA_DIR)):
+        if "." in state_name:
+            continue
+        for county_name in sorted(os.listdir(DATA_DIR + "\\" + state_name + "\\counties")):
+            if "." in county_name:
+                continue
+            counties.append((state_name, county_name))
+            if len(counties) >= limit:
+                return counties
+    return counties
+
+def time_per_county(function: Callable[[str, str], Any], counties: List[Tuple[str, str]]) -> float:
+    ''' Average seconds taken by function for each (state, county). '''
+    start = time.perf_counter()
+    for state_name, county_name in counties:
+        function(state_name, county_name)
+    return (time.perf_counter() - start) / max(1, len(counties))
+
+def benchmark_county_parsing(limit: int = 20) -> None:
+    ''' Compare per-county parse time of single-parse extraction against parsing per figure. '''
+    counties = list_counties(limit)
+    before = time_per_county(parse_per_figure, counties)
+    after = time_per_county(extract_from_files, counties)
+    print(f"{len(counties)} counties")
+    print(f"parse per figure:  {before * 1000:.1f} ms per county")
+    print(f"single parse:      {after * 1000:.1f} ms per county ({before / after:.2f}x)")
+
+def label_range_by_prettify(figure: Tag) -> Tuple[int, int]:
+    ''' Find the first label graphic and the number of label graphics the way read_statistics used to, by searching
+        each <g>'s prettified text. Kept as the baseline for benchmarks. '''
+    graphics = figure.select("g")
+    first = next((i for i, graphic in enumerate(graphics) if "font-style=\"normal\"" in graphic.prettify()), 0)
+    count = 0
+    for graphic in graphics[first:]:
+        if not "font-style=\"normal\"" in graphic.prettify():
+            break
+        count += 1
+    return first, count
+
+def label_range(figure: Tag, index: GraphicIndex) -> Tuple[int, int]:
+    ''' Find the first label graphic and the number of label graphics the way read_statistics does. '''
+    graphics = index.graphics_in(figure)
+    first = next((i for i, graphic in enumerate(graphics) if id(graphic) in index.normal), 0)
+    count = 0
+    for graphic in graphics[first:]:
+        if id(graphic) not in index.normal:
+            break
+        count += 1
+    return first, count
+
+def benchmark_statistics(limit: int = 20, pages: List[str] = ["Ancestry", "Industries"]) -> None:
+    ''' Time reading the statistics of the figures on the largest pages, and check that finding labels with a
+        GraphicIndex agrees with the old prettify() search on every figure. The index is built once per page, and
+        its time is counted against the page's figures.
+        What remains is the index's walk over the page: BeautifulSoup's descendants generator alone is about a
+        third of it, and prettified pages take longer, since every run of whitespace between tags is an element. '''
+    counties = list_counties(limit)
+    soups: List[Tuple[BeautifulSoup, List[Tag]]] = []
+    for state_name, county_name in counties:
+        for page in pages:
+            soup = parse_page(county_html_file(state_name, county_name, page))
+            soups.append((soup, list(get_graphics(soup).values())))
+    figures = sum(len(page_figures) for _, page_figures in soups)
+    for soup, page_figures in soups:
+        index = GraphicIndex(soup)
+        for figure in page_figures:
+            assert label_range(figure, index) == label_range_by_prettify(figure), "label search disagrees with prettify() search"
+            assert read_statistics(figure, index=index) == read_statistics(figure), "statistics differ with a page index"
+    start = time.perf_counter()
+    for _, page_figures in soups:
+        for figure in page_figures:
+            label_range_by_prettify(figure)
+    before = (time.perf_counter() - start) / max(1, figures)
+    start = time.perf_counter()
+    for soup, page_figures in soups:
+        index = GraphicIndex(soup)
+        for figure in page_figures:
+            label_range(figure, index)
+    after = (time.perf_counter() - start) / max(1, figures)
+    start = time.perf_counter()
+    for soup, page_figures in soups:
+        index = GraphicIndex(soup)
+        for figure in page_figures:
+            read_statistics(figure, index=index)
+    total = (time.perf_counter() - start) / max(1, figures)
+    print(f"{figures} figures on {', '.join(pages)} pages")
+    print(f"label search by prettify(): {before * 1000:.2f} ms per figure")
+    print(f"label search by page index: {after * 1000:.2f} ms per figure ({before / after:.1f}x)")
+    print(f"read_statistics:            {total * 1000:.2f} ms per figure")
+
+def benchmark_parsers(limit: int = 20) -> None:
+    ''' Compare the time and tree size of parsing every page of a county in full, and with only the figures. '''
+    counties = list_counties(limit)
+    paths = [county_html_file(state_name, county_name, page) for state_name, county_name in counties for page in PAGE_FIGURES]
+    modes = [("html.parser, full page", "html.parser", None), ("html.parser, figures only", "html.parser", FIGURES_ONLY)]
+    if PARSER != "html.parser":
+        modes.append((f"{PARSER}, figures only", PARSER, FIGURES_ONLY))
+    for label, parser, parse_only in modes:
+        start = time.perf_counter()
+        elements = 0
+        for path in paths:
+            elements += len(parse_page(path, parser, parse_only).find_all(True))
+        seconds = (time.perf_counter() - start) / max(1, len(counties))
+        print(f"{label + ':':28}{seconds * 1000:.1f} ms per county, {elements // max(1, len(counties))} elements per county")
+
+def main() -> None:
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    benchmark_county_parsing(limit)
+    benchmark_statistics(limit)
+    benchmark_parsers(limit)
+
+if __name__ == "__main__":
+    main()
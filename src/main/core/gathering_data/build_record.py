@@ -0,0 +1,31 @@
+from typing import Dict
+import sqlite3
+import time
+
+class BuildRecord:
+    ''' Record, kept in SQLite, of the hash of the pages each json file was last built from. A json file only
+        needs rebuilding when the hash of its pages changes. '''
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS outputs (
+                output TEXT PRIMARY KEY,
+                input_hash TEXT NOT NULL,
+                built_at REAL NOT NULL
+            )
+        ''')
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def hashes(self) -> Dict[str, str]:
+        ''' Get the input hash of every recorded json file, keyed by its path. '''
+        return {row[0]: row[1] for row in self.connection.execute("SELECT output, input_hash FROM outputs")}
+
+    def record(self, output: str, input_hash: str) -> None:
+        ''' Record that the json file at output was built from pages with the passed hash. '''
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO outputs (output, input_hash, built_at) VALUES (?, ?, ?)", (output, input_hash, time.time()))
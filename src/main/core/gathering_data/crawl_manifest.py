@@ -0,0 +1,87 @@
+from typing import List, Dict, Tuple, Any
+import sqlite3
+import time
+
+class CrawlManifest:
+    ''' Persistent record of a crawl, kept in SQLite. Stores the state and county links discovered on each page,
+        and the status of every page fetched, so an interrupted crawl can resume without rediscovering links
+        or checking files. Only use a manifest from the thread which created it. '''
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS discoveries (
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                discovered_at REAL NOT NULL,
+                PRIMARY KEY (url, kind)
+            );
+            CREATE TABLE IF NOT EXISTS links (
+                parent TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (parent, kind, url)
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                size INTEGER NOT NULL DEFAULT 0,
+                fetched_at REAL NOT NULL,
+                valid INTEGER NOT NULL DEFAULT 0
+            );
+        ''')
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def links(self, parent: str, kind: str) -> List[str] | None:
+        ''' Get the links of a kind ("state" or "county") discovered on the parent page, or None if the
+            parent page has not been searched yet. '''
+        if self.connection.execute("SELECT 1 FROM discoveries WHERE url = ? AND kind = ?", (parent, kind)).fetchone() is None:
+            return None
+        rows = self.connection.execute("SELECT url FROM links WHERE parent = ? AND kind = ? ORDER BY url", (parent, kind))
+        return [row[0] for row in rows]
+
+    def add_links(self, parent: str, kind: str, links: List[str]) -> None:
+        ''' Record every link of a kind found on the parent page, replacing any found on it before. '''
+        with self.connection:
+            self.connection.execute("DELETE FROM links WHERE parent = ? AND kind = ?", (parent, kind))
+            self.connection.executemany("INSERT OR IGNORE INTO links (parent, kind, url) VALUES (?, ?, ?)", [(parent, kind, link) for link in links])
+            self.connection.execute("INSERT OR REPLACE INTO discoveries (url, kind, discovered_at) VALUES (?, ?, ?)", (parent, kind, time.time()))
+
+    def record_page(self, url: str, path: str, status: str, size: int = 0, valid: bool = False) -> None:
+        ''' Record the result of fetching a page: status is "fetched" or "failed". '''
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages (url, path, status, size, fetched_at, valid) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, path, status, size, time.time(), int(valid)))
+
+    def record_pages(self, pages: List[Tuple[str, str, int]]) -> None:
+        ''' Record many (url, path, size) pages as fetched and valid at once. '''
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages (url, path, status, size, fetched_at, valid) VALUES (?, ?, 'fetched', ?, ?, 1)",
+                [(url, path, size, now) for url, path, size in pages])
+
+    def is_known(self, url: str) -> bool:
+        ''' Whether any result has been recorded for the page. '''
+        return self.connection.execute("SELECT 1 FROM pages WHERE url = ?", (url,)).fetchone() is not None
+
+    def is_done(self, url: str) -> bool:
+        ''' Whether the page has been fetched and is valid. '''
+        row = self.connection.execute("SELECT 1 FROM pages WHERE url = ? AND status = 'fetched' AND valid = 1", (url,)).fetchone()
+        return row is not None
+
+    def invalidate(self, path: str) -> None:
+        ''' Mark the page saved at path as invalid, so it will be fetched again. '''
+        with self.connection:
+            self.connection.execute("UPDATE pages SET valid = 0 WHERE path = ?", (path,))
+
+    def pages(self) -> Dict[str, Dict[str, Any]]:
+        ''' Get every recorded page, keyed by the path it was saved to. '''
+        rows = self.connection.execute("SELECT url, path, status, size, fetched_at, valid FROM pages")
+        return {row[1]: {"url": row[0], "status": row[2], "size": row[3], "fetched_at": row[4], "valid": bool(row[5])} for row in rows}
@@ -0,0 +1,76 @@
+from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+
+import page_reader
+from page_reader import get_response
+from page_files import write_page, find_page, read_page
+from crawl_manifest import CrawlManifest
+
+WORKERS = 4 # Pages fetched at once. The per-host rate limit in page_reader still applies across all workers.
+
+COMPRESSION = "none" # One of page_files.EXTENSIONS: "none", "gzip" or "zstd"
+
+def fetch_and_save(url: str, filepath: str, compression: str = COMPRESSION) -> str:
+    ''' Fetch a page and write its bytes, as received, to filepath (plus the compression's extension). If the
+        page_reader cache has validators for the page stored there, it is requested conditionally, and kept as it
+        is if unchanged. Pages are not parsed here; parsing is left to convert_html_json_files. Returns the path
+        of the page. '''
+    cache = page_reader.cache
+    entry = cache.load(url) if cache else None
+    if entry is not None and entry["page"] != find_page(filepath):
+        entry = None # Validators of a page stored somewhere else
+    response = get_response(url, cache.conditional_headers(entry) if cache else None)
+    if response.status_code == 304 and entry is not None:
+        return entry["page"]
+    path = write_page(filepath, response.content, compression)
+    if cache:
+        cache.store(url, response, path)
+    return path
+
+def adopt_stored_pages(jobs: List[Tuple[str, str]], manifest: CrawlManifest) -> List[Tuple[str, str]]:
+    ''' Record as done the pages of jobs the manifest has no record of which are already stored and valid, as
+        those from a crawl before the manifest was kept. Returns the jobs which still need fetching. '''
+    remaining: List[Tuple[str, str]] = []
+    adopted: List[Tuple[str, str, int]] = []
+    for url, filepath in jobs:
+        path = None if manifest.is_known(url) else find_page(filepath)
+        if path is not None and b"Too many requests" not in read_page(path)[:1000]:
+            adopted.append((url, path, os.path.getsize(path)))
+        else:
+            remaining.append((url, filepath))
+    if adopted:
+        manifest.record_pages(adopted)
+        print(f"{len(adopted)} pages already stored, recorded in the manifest")
+    return remaining
+
+def crawl(jobs: List[Tuple[str, str]], workers: int = WORKERS, refresh: bool = False, compression: str = COMPRESSION, manifest: CrawlManifest | None = None) -> List[Tuple[str, str]]:
+    ''' Fetch every (url, filepath) job using a pool of workers. Jobs whose page is already stored are skipped,
+        unless refreshing, where they are revalidated against the page_reader cache. With a manifest, stored
+        pages are those the manifest has as fetched and valid, or valid pages on disk it has no record of yet,
+        and every result is recorded in it.
+        Returns the jobs which failed. '''
+    if not refresh:
+        if manifest is not None:
+            jobs = [job for job in jobs if not manifest.is_done(job[0])]
+            jobs = adopt_stored_pages(jobs, manifest)
+        else:
+            jobs = [job for job in jobs if find_page(job[1]) is None]
+    failed: List[Tuple[str, str]] = []
+    if not jobs:
+        return failed
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(fetch_and_save, url, filepath, compression): (url, filepath) for url, filepath in jobs}
+        for future in as_completed(futures):
+            url, filepath = futures[future]
+            try:
+                path = future.result()
+                print(path)
+                if manifest is not None:
+                    manifest.record_page(url, path, "fetched", os.path.getsize(path), True)
+            except Exception as e:
+                print(f"FAILED: {url} ({e})")
+                failed.append((url, filepath))
+                if manifest is not None:
+                    manifest.record_page(url, filepath, "failed")
+    return failed
@@ -0,0 +1,124 @@
+from typing import List, Dict, Tuple
+import difflib
+import os
+import re
+import unicodedata
+
+# Prebuilt tables, kept beside this module so they load from any working directory
+TABLES_DIR = os.path.dirname(os.path.abspath(__file__))
+COUNTY_FIPS_FILE = os.path.join(TABLES_DIR, "county_fips.txt") # FIPS, state name, county name; tab separated
+STATE_FIPS_FILE = os.path.join(TABLES_DIR, "state_fips.txt") # STATE_NAME FIPS; space separated
+
+# Other names for counties, mapped to the name in the FIPS table. Names which only differ by punctuation, spacing,
+# accents, "Saint" for "St" or the word "Independent" (the Virginia independent cities) match without an alias.
+ALIASES: Dict[str, Dict[str, str]] = {
+    "Alaska" : {
+        "Municipality Of Anchorage" : "Anchorage Municipality",
+        "City And Borough Of Juneau" : "Juneau City And Borough",
+        "City And Borough Of Sitka" : "Sitka City And Borough",
+        "Municipality And Borough Of Skagway" : "Skagway Municipality",
+        # statisticalatlas.com still reports Valdez-Cordova (02261), which was split into these two in 2019
+        "Chugach Census Area" : "Valdez Cordova Census Area",
+        "Copper River Census Area" : "Valdez Cordova Census Area",
+        "City And Borough Of Wrangell" : "Wrangell City And Borough",
+        "City And Borough Of Yakutat" : "Yakutat City And Borough",
+        "Wade Hampton Census Area" : "Kusilvak Census Area", # renamed in 2015
+        "Prince Of Wales Outer Ketchikan Census Area" : "Prince Of Wales Hyder Census Area", # renamed in 2008
+        "Petersburg Census Area" : "Petersburg Borough", # incorporated in 2013
+        # Split into Skagway and Hoonah-Angoon in 2007; older pages for the whole area are read as Hoonah-Angoon,
+        # the larger part. If Hoonah-Angoon has its own folder as well, the two collide and conversion stops.
+        "Skagway Hoonah Angoon Census Area" : "Hoonah Angoon Census Area",
+    },
+    "Florida" : {
+        "Dade County" : "Miami Dade County", # renamed in 1997
+    },
+    "New Mexico" : {
+        "Doã±A Ana County" : "Doña Ana County",
+    },
+    "South Dakota" : {
+        "Shannon County" : "Oglala Lakota County", # renamed in 2015
+    },
+}
+
+# Words read as another, so both spellings index the same
+WORD_FORMS: Dict[str, str] = {"saint" : "st", "sainte" : "ste"}
+
+# Smallest similarity for a fuzzy match to be accepted
+FUZZY_CUTOFF = 0.85
+
+def normalize_name(name: str) -> str:
+    ''' Reduce a state or county name to the key it is indexed by: lowercase ascii letters and digits only, without
+        accents, punctuation, spaces or the word "independent", and with "saint" and "sainte" as "st" and "ste".
+        "Prince George's County", "prince_georges_county" and "Prince Georges County" all normalize to
+        "princegeorgescounty", and "Saint Louis City" and "St. Louis City" to "stlouiscity". '''
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    words = [WORD_FORMS.get(word, word) for word in re.split(r"[^a-z0-9']+", name) if word and word != "independent"]
+    return "".join(words).replace("'", "")
+
+class Gazetteer:
+    ''' Index of state and county FIPS codes by normalized name, with reverse lookup of names by FIPS code. '''
+
+    def __init__(self, county_file: str = COUNTY_FIPS_FILE, state_file: str = STATE_FIPS_FILE):
+        self.state_codes: Dict[str, str] = {} # normalized state name -> FIPS
+        self.county_codes: Dict[str, Dict[str, str]] = {} # normalized state name -> normalized county name -> FIPS
+        self.names: Dict[str, Tuple[str, str]] = {} # FIPS -> (county name, state name), county name "" for states
+        with open(state_file, 'r', encoding='utf-8') as states:
+            for line in states:
+                if not line.strip():
+                    continue
+                name, code = line.split()
+                name = name.replace("_", " ").title()
+                self.state_codes[normalize_name(name)] = code
+                self.names[code] = ("", name)
+        with open(county_file, 'r', encoding='utf-8') as counties:
+            for line in counties:
+                if not line.strip():
+                    continue
+                code, state_name, county_name = line.rstrip("\n").split("\t")
+                self.county_codes.setdefault(normalize_name(state_name), {})[normalize_name(county_name)] = code
+                self.names[code] = (county_name, state_name)
+        for state_name, aliases in ALIASES.items():
+            state_counties = self.county_codes.get(normalize_name(state_name), {})
+            for alias, county_name in aliases.items():
+                code = state_counties.get(normalize_name(county_name))
+                if code is not None:
+                    state_counties.setdefault(normalize_name(alias), code)
+
+    def state_fips(self, state_name: str) -> str | None:
+        ''' Get the FIPS code of a state from its name or folder name, or None if there is no such state. '''
+        return self.state_codes.get(normalize_name(state_name))
+
+    def county_fips(self, county_name: str, state_name: str, fuzzy: bool = False) -> str | None:
+        ''' Get the FIPS code of a county from its name or folder name and its state's. If there is no exact match
+            and fuzzy is set, use the closest county name in the state, if it is close enough, and report it: a
+            close name may be a different county. '''
+        state_counties = self.county_codes.get(normalize_name(state_name))
+        if state_counties is None:
+            return None
+        key = normalize_name(county_name)
+        code = state_counties.get(key)
+        if code is None and fuzzy:
+            matches = difflib.get_close_matches(key, state_counties.keys(), n=1, cutoff=FUZZY_CUTOFF)
+            if matches:
+                code = state_counties[matches[0]]
+                print(f"Fuzzy match: {county_name}, {state_name} read as {self.names[code][0]} ({code})")
+        return code
+
+    def name(self, fips: str) -> Tuple[str, str] | None:
+        ''' Get the (county name, state name) with a FIPS code, with an empty county name for a state's code. '''
+        return self.names.get(fips)
+
+    def counties(self, state_name: str = "") -> List[str]:
+        ''' Get the FIPS codes of every county, or of every county in one state, in order. '''
+        if state_name:
+            state_code = self.state_fips(state_name)
+            return sorted(code for code in self.names if len(code) == 5 and code[:2] == state_code)
+        return sorted(code for code in self.names if len(code) == 5)
+
+_gazetteer: Gazetteer | None = None
+def get_gazetteer() -> Gazetteer:
+    ''' Get the shared gazetteer, loaded on first use. '''
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer()
+    return _gazetteer
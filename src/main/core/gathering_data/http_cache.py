@@ -0,0 +1,56 @@
+from typing import Dict, Any
+import hashlib
+import json
+import os
+
+import requests
+
+class HttpCache:
+    ''' On-disk record of stored pages' validators, keyed by url: each page's ETag and Last-Modified, with the path
+        the page was written to and that file's size and modification time. Later requests for the page can be
+        made conditional, and a 304 answered from the stored page itself, so no second copy of the body is kept. '''
+
+    def __init__(self, directory: str):
+        self.directory: str = directory
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".json")
+
+    def load(self, url: str) -> Dict[str, Any] | None:
+        ''' Get the cached entry for a url (url, etag, last_modified, page), or None if not cached or its page is
+            gone or has been written since. '''
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as meta_file:
+                entry: Dict[str, Any] = json.load(meta_file)
+            stat = os.stat(entry["page"])
+        except (OSError, ValueError, KeyError):
+            return None
+        if entry.get("url") != url or [stat.st_size, stat.st_mtime_ns] != [entry.get("size"), entry.get("mtime_ns")]:
+            return None
+        return entry
+
+    def conditional_headers(self, entry: Dict[str, Any] | None) -> Dict[str, str]:
+        ''' Request headers which ask the server to answer 304 if the cached entry is still current. '''
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, response: requests.Response, page: str) -> None:
+        ''' Record the validators of a response whose body was written to page, if the server sent any. Pages
+            without validators could never be revalidated. '''
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        stat = os.stat(page)
+        entry = {"url": url, "etag": etag, "last_modified": last_modified, "page": page, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        path = self._path(url)
+        with open(path + ".part", 'w', encoding='utf-8') as meta_file:
+            json.dump(entry, meta_file)
+        os.replace(path + ".part", path)
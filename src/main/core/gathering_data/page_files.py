@@ -0,0 +1,53 @@
+from typing import Dict
+import gzip
+import os
+
+try:
+    import zstandard # Optional: only needed for zstd compressed pages
+except ImportError:
+    zstandard = None
+
+# File extension added to a page's path for each compression
+EXTENSIONS: Dict[str, str] = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+def page_path(filepath: str, compression: str = "none") -> str:
+    ''' Get the path a page is written to with the passed compression. '''
+    return filepath + EXTENSIONS[compression]
+
+def find_page(filepath: str) -> str | None:
+    ''' Get the path of the stored page for filepath, whichever compression it was saved with, or None if not stored. '''
+    for extension in EXTENSIONS.values():
+        if os.path.exists(filepath + extension):
+            return filepath + extension
+    return None
+
+def write_page(filepath: str, content: bytes, compression: str = "none") -> str:
+    ''' Write the bytes of a page to filepath, compressed if requested. The file only appears once complete.
+        Returns the path written. '''
+    path = page_path(filepath, compression)
+    if compression == "gzip":
+        content = gzip.compress(content)
+    elif compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        content = zstandard.ZstdCompressor().compress(content)
+    temp_path = path + ".part"
+    with open(temp_path, 'wb') as out:
+        out.write(content)
+    os.replace(temp_path, path)
+    return path
+
+def read_page(filepath: str) -> bytes:
+    ''' Read the bytes of the page stored for filepath (which may have a compression extension, or none). '''
+    path = filepath if os.path.exists(filepath) else find_page(filepath)
+    if path is None:
+        raise FileNotFoundError(filepath)
+    with open(path, 'rb') as data:
+        content = data.read()
+    if path.endswith(EXTENSIONS["gzip"]):
+        return gzip.decompress(content)
+    if path.endswith(EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise ImportError("reading zstd compressed pages requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(content)
+    return content
@@ -1,13 +1,83 @@
-from typing import List, Set
+from typing import List, Dict, Set
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import requests
+import threading
 
-from Paths import ROOT_URL
+from Paths import ROOT_URL, CACHE_DIR
+from rate_limiter import HostRateLimiter
+from http_cache import HttpCache
+
+REQUESTS_PER_SECOND = 2.0 # Average requests per second allowed to each host
+BURST = 4 # Requests which may be sent back-to-back before the rate limit applies
+MAX_RETRIES = 6 # Attempts for a rate limited page before giving up
+BACKOFF_SECONDS = 5.0 # First backoff after being rate limited, doubled on each retry
+MAX_BACKOFF_SECONDS = 300.0
+TIMEOUT_SECONDS = 60.0
+
+limiter = HostRateLimiter(REQUESTS_PER_SECOND, BURST)
+cache: HttpCache | None = HttpCache(CACHE_DIR)
+_local = threading.local()
+
+class RateLimitError(Exception):
+    ''' Raised when a page keeps answering "Too many requests" after all retries. '''
+    pass
+
+def set_rate_limit(requests_per_second: float, burst: int = BURST) -> None:
+    ''' Replace the per-host rate limit used by every request. '''
+    global limiter
+    limiter = HostRateLimiter(requests_per_second, burst)
+
+def set_cache(directory: str | None) -> None:
+    ''' Use an HttpCache in the passed directory, or no cache if None. '''
+    global cache
+    cache = HttpCache(directory) if directory else None
+
+def get_session() -> requests.Session:
+    ''' Get this thread's keep-alive session. Sessions are kept per thread, since requests does not guarantee
+        a Session is safe to share between threads. '''
+    session: requests.Session | None = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        _local.session = session
+    return session
+
+def is_rate_limited(response: requests.Response) -> bool:
+    ''' Whether the response is a rate limit message instead of the requested page. '''
+    return response.status_code == 429 or b"Too many requests" in response.content[:1000]
+
+def backoff_delay(response: requests.Response, attempt: int) -> float:
+    ''' Seconds to wait after being rate limited, honoring Retry-After when the server sends one. '''
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return float(retry_after)
+    return min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt)
+
+def get_response(url: str, headers: Dict[str, str] | None = None) -> requests.Response:
+    ''' Request a url, waiting on the host's rate limit and backing off when rate limited. Conditional requests
+        (see HttpCache.conditional_headers) may be answered with a 304 response. '''
+    for attempt in range(MAX_RETRIES):
+        limiter.acquire(url)
+        response = get_session().get(url, headers=headers, timeout=TIMEOUT_SECONDS)
+        if response.status_code == 304 and headers:
+            return response
+        if not is_rate_limited(response):
+            response.raise_for_status()
+            return response
+        delay = backoff_delay(response, attempt)
+        print(f"Rate limited on {url}, backing off {delay:.1f}s")
+        limiter.pause(url, delay) # Holds back every worker using this host, including this one
+    raise RateLimitError(url)
+
+def get_page_bytes(url: str) -> bytes:
+    ''' Get the undecoded body of a url. '''
+    return get_response(url).content
 
 def get_soup(url: str) -> BeautifulSoup:
     ''' Get BeautifulSoup for a url. '''
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(get_page_bytes(url), 'html.parser')
     return soup
 
 def absolute_url(url: str) -> str:
@@ -0,0 +1,65 @@
+from typing import Dict
+from urllib.parse import urlsplit
+import threading
+import time
+
+class TokenBucket:
+    ''' Token bucket allowing rate requests per second on average, with bursts of up to capacity requests. '''
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate: float = rate
+        self.capacity: float = max(1.0, capacity)
+        self.tokens: float = self.capacity
+        self.updated: float = time.monotonic()
+        self.paused_until: float = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> None:
+        ''' Block until a token is available, then take it. '''
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return
+                    wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        ''' Hand out no tokens for the next number of seconds, and empty the bucket so requests resume slowly. '''
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+class HostRateLimiter:
+    ''' Keeps one TokenBucket per host, so every host is limited independently. '''
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        ''' Get the bucket for the host of a url. '''
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+    def acquire(self, url: str) -> None:
+        self.bucket(url).acquire()
+
+    def pause(self, url: str, seconds: float) -> None:
+        self.bucket(url).pause(seconds)
@@ -0,0 +1,60 @@
+from typing import Dict, Any
+import os
+
+import pytest
+
+from CountyCatalog import CountyCatalog
+
+def county_path(folder: str, name: str) -> str:
+    return os.path.join("resources", folder, "counties", name + ".json")
+
+def record(name: str, population: int = 1000, fips: str | None = None) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"name": name, "population": population, "demographics": {"Age": {"0-9": 0.1}}}
+    if fips is not None:
+        result["FIPS"] = fips
+    return result
+
+@pytest.mark.parametrize("fips_first", [True, False])
+def test_fips_named_file_is_kept(fips_first):
+    ''' Of a county's FIPS-named and county-named files, the FIPS-named one is kept whichever is read first. '''
+    catalog = CountyCatalog()
+    files = [(county_path("missouri", "29189"), record("St. Louis County", fips="29189")),
+             (county_path("missouri", "st_louis_county"), record("St. Louis County"))]
+    for path, data in files if fips_first else files[::-1]:
+        catalog.add(path, "missouri", data)
+    assert catalog.fips_codes() == ["29189"]
+    assert catalog.paths["29189"] == files[0][0]
+    assert catalog.records["29189"]["folder"] == "missouri"
+    assert catalog.duplicates == {"29189": [files[1][0]]}
+    assert catalog.conflicts == []
+
+def test_differing_duplicates_are_conflicts():
+    catalog = CountyCatalog()
+    catalog.add(county_path("missouri", "st_louis_county"), "missouri", record("St. Louis County", 990000))
+    catalog.add(county_path("missouri", "29189"), "missouri", record("St. Louis County", 1000000))
+    assert catalog.records["29189"]["population"] == 1000000
+    assert len(catalog.conflicts) == 1 and "population" in catalog.conflicts[0]
+
+def test_recorded_fips_disagreeing_with_name_is_a_conflict():
+    ''' A county-named file is keyed by the county its name is, even if it records another FIPS code. '''
+    catalog = CountyCatalog()
+    catalog.add(county_path("missouri", "st_louis_city"), "missouri", record("St. Louis City", fips="29189"))
+    assert catalog.fips_codes() == ["29510"]
+    assert len(catalog.conflicts) == 1 and "29189" in catalog.conflicts[0]
+
+def test_two_counties_with_one_fips_collide():
+    ''' Chugach and Copper River are both read as Valdez-Cordova, so two county-named files of them would be two
+        counties silently read as one. '''
+    catalog = CountyCatalog()
+    catalog.add(county_path("alaska", "chugach_census_area"), "alaska", record("Chugach Census Area"))
+    with pytest.raises(ValueError, match="02261"):
+        catalog.add(county_path("alaska", "copper_river_census_area"), "alaska", record("Copper River Census Area"))
+
+def test_unknown_counties():
+    ''' A county the gazetteer does not know is keyed by its recorded FIPS code, or skipped without one. '''
+    catalog = CountyCatalog()
+    catalog.add(county_path("missouri", "new_county"), "missouri", record("New County", fips="29999"))
+    catalog.add(county_path("missouri", "other_county"), "missouri", record("Other County"))
+    assert catalog.fips_codes() == ["29999"]
+    assert catalog.unidentified == [county_path("missouri", "other_county")]
+    assert len(catalog) == 1
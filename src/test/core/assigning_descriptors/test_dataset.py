@@ -0,0 +1,55 @@
+from typing import List
+import math
+
+import numpy as np
+import pytest
+
+from CountyData import CountyData
+from Dataset import Dataset
+
+STATE_SIZES = {"alabama": 67, "delaware": 3, "hawaii": 5, "texas": 254, "wyoming": 23}
+
+def county_data() -> CountyData:
+    ''' County data with STATE_SIZES counties in each state, the states interleaved. '''
+    states: List[str] = []
+    while len(states) < sum(STATE_SIZES.values()):
+        states += [state for state, size in STATE_SIZES.items() if states.count(state) < size]
+    fips = np.array([f"{i:05d}" for i in range(len(states))])
+    return CountyData(fips, fips.copy(), np.array(states), np.ones(len(states), dtype=np.int64), ["a"], np.zeros((len(states), 1)))
+
+def dataset(**filters) -> Dataset:
+    result = Dataset(**filters)
+    result._data = county_data()
+    return result
+
+@pytest.mark.parametrize("size", [1, 7, 50, 100, 351])
+@pytest.mark.parametrize("seed", [1, 2])
+def test_sample_is_stratified(size, seed):
+    ''' The sample has size distinct counties, each state's share within one of its share of the nation. '''
+    sample = dataset(sample=size, seed=seed)
+    rows = sample.rows
+    assert len(rows) == size
+    assert len(np.unique(rows)) == size
+    assert (np.diff(rows) > 0).all()
+    states, counts = np.unique(sample.data.states[rows], return_counts=True)
+    counts = dict(zip(states.tolist(), counts.tolist()))
+    assert sum(counts.values()) == size
+    total = sum(STATE_SIZES.values())
+    for state, state_size in STATE_SIZES.items():
+        quota = state_size * size / total
+        assert math.floor(quota) <= counts.get(state, 0) <= math.ceil(quota)
+
+def test_same_seed_same_sample():
+    first = dataset(sample=40, seed=7).rows
+    assert (dataset(sample=40, seed=7).rows == first).all()
+    assert not np.array_equal(dataset(sample=40, seed=8).rows, first)
+
+def test_sample_of_filtered_counties():
+    ''' The sample is taken from the counties the other filters select. '''
+    sample = dataset(states=["Texas", "Wyoming"], sample=20, seed=3)
+    assert set(sample.data.states[sample.rows].tolist()) == {"texas", "wyoming"}
+    assert len(sample) == 20
+    assert sample.includes_state("wyoming") and not sample.includes_state("Delaware")
+
+def test_sample_larger_than_dataset():
+    assert len(dataset(states=["delaware"], sample=10, seed=1)) == 3
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from Membership import Membership
+
+ROWS, COLUMNS = 12, 7
+
+def check(membership: Membership, reference: np.ndarray, values: np.ndarray) -> None:
+    ''' The membership agrees with the dense boolean matrix reference everywhere. '''
+    for row in range(ROWS):
+        assert sorted(membership.columns(row)) == np.flatnonzero(reference[row]).tolist()
+        assert membership.count(row) == reference[row].sum()
+        for column in range(COLUMNS):
+            assert membership.has(row, column) == reference[row, column]
+    for column in range(COLUMNS):
+        assert sorted(membership.users(column).tolist()) == np.flatnonzero(reference[:, column]).tolist()
+        assert membership.user_count(column) == reference[:, column].sum()
+    rows = [5, 0, 11, 5, 3]
+    assert membership.product(values, rows) == pytest.approx(reference[rows].astype(float) @ values)
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_changes_match_dense_matrix(seed):
+    ''' users and product follow every add, remove and toggle, including repeated and undone ones. '''
+    rng = np.random.default_rng(seed)
+    membership = Membership(ROWS, COLUMNS)
+    reference = np.zeros((ROWS, COLUMNS), dtype=bool)
+    values = rng.random((COLUMNS, 4))
+    check(membership, reference, values)
+    for _ in range(400):
+        row, column = int(rng.integers(ROWS)), int(rng.integers(COLUMNS))
+        change = rng.choice(["add", "remove", "toggle"])
+        if change == "add":
+            assert membership.add(row, column) == (not reference[row, column])
+            reference[row, column] = True
+        elif change == "remove":
+            assert membership.remove(row, column) == reference[row, column]
+            reference[row, column] = False
+        else:
+            reference[row, column] = not reference[row, column]
+            assert membership.toggle(row, column) == reference[row, column]
+        check(membership, reference, values)
+
+def test_columns_in_order_assigned():
+    membership = Membership(2, 5)
+    for column in [3, 0, 4]:
+        membership.add(1, column)
+    membership.toggle(1, 0)
+    membership.toggle(1, 0)
+    assert membership.columns(1) == [3, 4, 0]
+    assert membership.columns(0) == []
+    assert membership.product(np.eye(5), [0]).tolist() == [[0.0] * 5]
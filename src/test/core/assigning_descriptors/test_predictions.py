@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from Membership import Membership
+from Predictions import Predictions
+
+COUNTIES, DESCRIPTORS, DEMOGRAPHICS = 30, 8, 5
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_updates_match_rebuild(seed):
+    ''' After a sequence of moves as Test makes them (assigning or unassigning a descriptor, changing one effect),
+        some undone by restoring saved predictions, the updated predictions equal those computed from scratch. '''
+    rng = np.random.default_rng(seed)
+    effects = rng.normal(size=(DESCRIPTORS, DEMOGRAPHICS))
+    membership = Membership(COUNTIES, DESCRIPTORS)
+    for _ in range(60):
+        membership.add(int(rng.integers(COUNTIES)), int(rng.integers(DESCRIPTORS)))
+    predictions = Predictions(COUNTIES, lambda rows: membership.product(effects, rows))
+    for step in range(2000):
+        undo = rng.random() < 0.3
+        if rng.random() < 0.5:
+            row, descriptor = int(rng.integers(COUNTIES)), int(rng.integers(DESCRIPTORS))
+            saved = predictions.save([row])
+            assigned = membership.toggle(row, descriptor)
+            predictions.add([row], effects[descriptor], 1.0 if assigned else -1.0)
+            if undo:
+                membership.toggle(row, descriptor)
+                predictions.restore([row], saved)
+        else:
+            descriptor, column = int(rng.integers(DESCRIPTORS)), int(rng.integers(DEMOGRAPHICS))
+            affected = membership.users(descriptor)
+            old_value, new_value = effects[descriptor, column], effects[descriptor, column] + rng.normal()
+            saved = predictions.save(affected, column)
+            effects[descriptor, column] = new_value
+            predictions.add_to_column(affected, column, new_value - old_value)
+            if undo:
+                effects[descriptor, column] = old_value
+                predictions.restore(affected, saved, column)
+        if step % 100 == 0:
+            assert predictions[:] == pytest.approx(membership.product(effects, range(COUNTIES)), abs=1e-9)
+    assert predictions[:] == pytest.approx(membership.product(effects, range(COUNTIES)), abs=1e-9)
+
+def test_repeated_rows():
+    ''' A county listed twice gets a descriptor's effects twice. '''
+    effects = np.array([[1.0, 2.0], [0.5, -1.0]])
+    predictions = Predictions(3, lambda rows: np.zeros((len(rows), 2)))
+    predictions.add([0, 2, 2], effects[0])
+    predictions.add_to_column([2, 2, 1], 1, 0.25)
+    assert predictions[:].tolist() == [[1.0, 2.0], [0.0, 0.25], [2.0, 4.5]]
+    predictions.add([2], effects[0], -1.0)
+    assert predictions[2].tolist() == [1.0, 2.5]
+
+def test_rebuilds_after_interval(monkeypatch):
+    ''' Every REBUILD_INTERVAL updates the matrix is computed again from scratch. '''
+    monkeypatch.setattr(Predictions, "REBUILD_INTERVAL", 3)
+    computed = []
+    predictions = Predictions(2, lambda rows: computed.append(list(rows)) or np.zeros((len(rows), 1)))
+    for _ in range(2):
+        predictions.add([0], np.array([1.0]))
+    assert predictions[0].tolist() == [2.0] and len(computed) == 1
+    predictions.add([0], np.array([1.0]))
+    assert predictions[0].tolist() == [0.0] and computed == [[0, 1], [0, 1]]
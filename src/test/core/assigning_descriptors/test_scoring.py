@@ -0,0 +1,137 @@
+from typing import List, Dict
+import math
+import random
+
+import numpy as np
+import pytest
+
+import Main
+import Test
+from Scoring import ScoringEngine, ScoreTable, similarities, demographics_matrix
+
+TOLERANCE = 1e-9
+KEYS = [f"demographic {i}" for i in range(12)]
+
+def random_dict(rng: random.Random, negative: bool = False) -> Dict[str, float]:
+    ''' A demographics dictionary over some of KEYS, with some values zero, and some negative if asked. '''
+    d: Dict[str, float] = {}
+    for key in rng.sample(KEYS, rng.randint(1, len(KEYS))):
+        value = rng.choice([0.0, rng.random(), rng.random() * 100])
+        d[key] = -value if negative and rng.random() < 0.3 else value
+    return d
+
+def random_pairs(seed: int, count: int = 200) -> List[tuple]:
+    ''' Pairs of (expected, actual) dictionaries, including all-zero, empty and negative ones. '''
+    rng = random.Random(seed)
+    pairs = [(random_dict(rng, negative=i % 3 == 0), random_dict(rng, negative=i % 4 == 0)) for i in range(count)]
+    pairs += [({k: 0.0 for k in KEYS}, random_dict(rng)), (random_dict(rng), {k: 0.0 for k in KEYS}),
+              ({k: 0.0 for k in KEYS}, {}), (random_dict(rng), {}), ({KEYS[0]: 1.0}, {KEYS[1]: 1.0})]
+    return pairs
+
+def batch(pairs: List[tuple]) -> tuple:
+    ''' The expected and actual matrices of the pairs, a row for each pair. '''
+    return demographics_matrix([e for e, _ in pairs], KEYS), demographics_matrix([a for _, a in pairs], KEYS)
+
+@pytest.mark.parametrize("method", ["l1", "l2", "cosine", "js"])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_similarities_match_main(method, seed):
+    pairs = random_pairs(seed)
+    expected, actual = batch(pairs)
+    reference = [Main.compare_demographics(e, a, method) for e, a in pairs]
+    assert similarities(expected, actual, method) == pytest.approx(reference, rel=TOLERANCE, abs=TOLERANCE)
+
+@pytest.mark.parametrize("method, engine_method, empty_score", [("l1", "l1", 0.0), ("l2", "l2", None), ("js", "js", None), ("cosine", "dot", None)])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_similarities_match_test(method, engine_method, empty_score, seed):
+    ''' Test.compare_demographics scores an l1 comparison with no prediction 0, and its "cosine" is a dot product. '''
+    pairs = random_pairs(seed)
+    expected, actual = batch(pairs)
+    reference = [Test.compare_demographics(e, a, method) for e, a in pairs]
+    assert similarities(expected, actual, engine_method, empty_score) == pytest.approx(reference, rel=TOLERANCE, abs=TOLERANCE)
+
+@pytest.mark.parametrize("method", ["l1", "l2", "cosine", "js", "dot"])
+def test_empty_score(method):
+    ''' Rows predicting nothing for a county with demographics get empty_score; other rows are unchanged. '''
+    expected = np.array([[1.0, 2.0, 3.0], [1.0, 2.0, 3.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    actual = np.array([[0.0, 0.0, 0.0], [1.0, 2.0, 3.0], [0.0, 0.0, 0.0], [2.0, 0.0, 0.0]])
+    scored = similarities(expected, actual, method, empty_score=0.0)
+    unscored = similarities(expected, actual, method)
+    assert scored[0] == 0.0
+    assert scored[1:] == pytest.approx(unscored[1:])
+    # With nothing expected and nothing predicted the rows are identical, not empty
+    assert scored[2] == unscored[2]
+
+def test_engine_scores_sums_of_effects():
+    ''' A county's predicted demographics are the sum of its descriptors' effect rows. '''
+    rng = np.random.default_rng(4)
+    observed = rng.random((5, len(KEYS)))
+    effects = rng.random((4, len(KEYS))) - 0.2
+    assignments = [[0], [1, 2], [], [0, 1, 2, 3], [3, 3]]
+    engine = ScoringEngine(observed, effects, "l1", empty_score=0.0)
+    predicted = engine.predicted(assignments)
+    for row, rows in enumerate(assignments):
+        assert predicted[row] == pytest.approx(effects[rows].sum(axis=0) if rows else np.zeros(len(KEYS)))
+    reference = []
+    for row in range(len(assignments)):
+        expected = dict(zip(KEYS, observed[row]))
+        actual = {k: v for k, v in zip(KEYS, predicted[row]) if v != 0}
+        reference.append(Test.compare_demographics(expected, actual, "l1"))
+    assert engine.scores(range(len(assignments)), predicted) == pytest.approx(reference, rel=TOLERANCE, abs=TOLERANCE)
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        ScoringEngine(np.zeros((1, 1)), np.zeros((1, 1)), "manhattan")
+
+def test_score_table_total_survives_large_swings():
+    ''' Scores swinging to about 1e17 and back leave the total equal to the sum of the scores. '''
+    rng = np.random.default_rng(5)
+    table = ScoreTable(13)
+    for _ in range(5000):
+        rows = rng.choice(13, size=rng.integers(1, 4), replace=False)
+        values = rng.normal(size=len(rows))
+        swings = rng.random(len(rows)) < 0.2
+        values[swings] = rng.choice([-1.0, 1.0], size=swings.sum()) * 10.0 ** rng.uniform(10, 17, size=swings.sum())
+        table.update(rows, values)
+        assert table.total == pytest.approx(math.fsum(table.scores), rel=1e-15, abs=1e-9)
+    # Bring every score back to a small value: no digits of the total may have been lost on the way
+    table.update(range(13), rng.normal(size=13))
+    assert table.total == pytest.approx(math.fsum(table.scores), abs=1e-12)
+    assert table.total == pytest.approx(table.scores.sum(), abs=1e-9)
+    assert table.average() == pytest.approx(table.scores.mean(), abs=1e-9)
+
+@pytest.mark.filterwarnings("ignore:invalid value:RuntimeWarning") # inf - inf
+def test_score_table_infinite_scores():
+    ''' An infinite or NaN score makes the total so, until it is replaced. '''
+    table = ScoreTable(3)
+    table.update([0, 1, 2], np.array([0.5, 0.25, 0.125]))
+    table.update([1], np.array([np.inf]))
+    assert table.total == np.inf
+    table.update([2], np.array([1.0]))
+    assert table.total == np.inf
+    table.update([0], np.array([-np.inf]))
+    assert np.isnan(table.total)
+    table.update([0], np.array([0.5]))
+    assert table.total == np.inf
+    table.update([1], np.array([np.nan]))
+    assert np.isnan(table.total)
+    table.update([1], np.array([0.25]))
+    assert table.total == 1.75
+
+@pytest.mark.parametrize("method", ["l1", "l2", "cosine", "js", "dot"])
+def test_engine_scores_rows_of_shared_matrix(method):
+    ''' Scoring rows, or rows and columns, of a larger matrix, as of the memory-mapped county data, scores the
+        same as a copy of them. '''
+    rng = np.random.default_rng(6)
+    data = rng.random((20, 9))
+    rows = np.array([3, 17, 0, 8, 8, 12])
+    columns = np.array([4, 0, 8, 2, 7, 1])
+    effects = rng.random((4, len(columns))) - 0.3
+    assignments = [[0], [1, 2], [], [0, 1, 2, 3], [3], [2, 3]]
+    counties = [5, 0, 2, 4, 1]
+    predicted = ScoringEngine(data, effects).predicted(assignments)[counties]
+    shared = ScoringEngine(data, effects, method, empty_score=0.0, rows=rows, columns=columns)
+    copied = ScoringEngine(data[rows][:, columns], effects, method, empty_score=0.0)
+    assert shared.scores(counties, predicted) == pytest.approx(copied.scores(counties, predicted), rel=TOLERANCE, abs=TOLERANCE)
+    shared = ScoringEngine(data[:, :len(columns)], effects, method, empty_score=0.0, rows=rows)
+    copied = ScoringEngine(data[rows, :len(columns)], effects, method, empty_score=0.0)
+    assert shared.scores(counties, predicted) == pytest.approx(copied.scores(counties, predicted), rel=TOLERANCE, abs=TOLERANCE)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The data gathering modules import each other by name, as when run from their own folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "main", "core", "gathering_data"))
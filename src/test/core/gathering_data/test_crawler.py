@@ -0,0 +1,147 @@
+from typing import List, Dict, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+
+import pytest
+
+import page_reader
+import crawler
+from rate_limiter import HostRateLimiter
+from http_cache import HttpCache
+from page_files import find_page, read_page
+
+class StubServer:
+    ''' Local HTTP server which answers each path with its queue of (status, body) or (status, body, headers)
+        responses, repeating the last, and records when every request arrived and its headers. '''
+
+    def __init__(self):
+        self.responses: Dict[str, List[tuple]] = {}
+        self.requests: List[Tuple[str, float]] = [] # (path, time received)
+        self.headers: List[Dict[str, str]] = [] # Headers of each request, in the order of requests
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append((self.path, time.monotonic()))
+                    stub.headers.append(dict(self.headers))
+                    queue = stub.responses.get(self.path, [(404, b"Not found")])
+                    status, body, *headers = queue.pop(0) if len(queue) > 1 else queue[0]
+                self.send_response(status)
+                for name, value in (headers[0] if headers else {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def times(self, path: str) -> List[float]:
+        return [received for requested, received in self.requests if requested == path]
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def server(monkeypatch):
+    ''' A stub server, with the page reader uncached and backing off quickly. '''
+    monkeypatch.setattr(page_reader, "cache", None)
+    monkeypatch.setattr(page_reader, "limiter", HostRateLimiter(1000.0, 1000))
+    monkeypatch.setattr(page_reader, "BACKOFF_SECONDS", 0.1)
+    stub = StubServer()
+    yield stub
+    stub.close()
+
+def test_rate_limit_is_respected(server, tmp_path, monkeypatch):
+    ''' Every worker shares the host's token bucket, so requests arrive no faster than its rate after the burst. '''
+    rate, burst, pages = 20.0, 2, 10
+    monkeypatch.setattr(page_reader, "limiter", HostRateLimiter(rate, burst))
+    jobs = []
+    for i in range(pages):
+        server.responses[f"/page/{i}"] = [(200, f"<html>page {i}</html>".encode())]
+        jobs.append((f"{server.url}/page/{i}", str(tmp_path / f"page_{i}")))
+    assert crawler.crawl(jobs, workers=4) == []
+    times = sorted(received for _, received in server.requests)
+    assert len(times) == pages
+    # The burst goes out at once, then one request per 1 / rate seconds
+    assert times[-1] - times[0] >= (pages - burst) / rate * 0.9
+    for i in range(pages):
+        assert read_page(str(tmp_path / f"page_{i}")) == f"<html>page {i}</html>".encode()
+
+def test_hosts_are_limited_separately():
+    ''' Waiting on one host's bucket does not hold back another host. '''
+    limiter = HostRateLimiter(1.0, 1)
+    limiter.acquire("http://127.0.0.1/a")
+    started = time.monotonic()
+    limiter.acquire("http://localhost/a")
+    assert time.monotonic() - started < 0.5
+    assert limiter.bucket("http://127.0.0.1/b") is limiter.bucket("http://127.0.0.1/a")
+
+@pytest.mark.parametrize("response", [(429, b"Slow down"), (200, b"<html>Too many requests</html>")])
+def test_rate_limited_page_is_retried_with_backoff(server, tmp_path, response):
+    ''' A 429 status or a "Too many requests" body is retried after a backoff, which doubles each time. '''
+    server.responses["/page"] = [response, response, (200, b"<html>page</html>")]
+    assert crawler.crawl([(f"{server.url}/page", str(tmp_path / "page"))], workers=1) == []
+    times = server.times("/page")
+    assert len(times) == 3
+    assert times[1] - times[0] >= page_reader.BACKOFF_SECONDS * 0.9
+    assert times[2] - times[1] >= page_reader.BACKOFF_SECONDS * 2 * 0.9
+    assert read_page(str(tmp_path / "page")) == b"<html>page</html>"
+
+def test_retry_after_is_honored():
+    ''' A Retry-After header sets the backoff instead of the doubling delay. '''
+    class Response:
+        headers = {"Retry-After": "2"}
+    assert page_reader.backoff_delay(Response(), 3) == 2.0
+
+def test_no_bad_file_is_written(server, tmp_path, monkeypatch):
+    ''' A page still rate limited after every retry fails without writing a file, and the other pages are kept. '''
+    monkeypatch.setattr(page_reader, "MAX_RETRIES", 2)
+    server.responses["/limited"] = [(429, b"Too many requests")]
+    server.responses["/rate_limit_body"] = [(200, b"Too many requests")]
+    server.responses["/good"] = [(200, b"<html>good</html>")]
+    jobs = [(f"{server.url}/{name}", str(tmp_path / name)) for name in ["limited", "rate_limit_body", "good"]]
+    failed = crawler.crawl(jobs, workers=3)
+    assert sorted(failed) == sorted(jobs[:2])
+    assert len(server.times("/limited")) == 2
+    assert find_page(str(tmp_path / "limited")) is None
+    assert find_page(str(tmp_path / "rate_limit_body")) is None
+    assert sorted(os.listdir(tmp_path)) == ["good"]
+
+def test_unchanged_page_is_kept(server, tmp_path, monkeypatch):
+    ''' Refreshing a page with validators asks for it conditionally, and on a 304 keeps the stored page as it is.
+        The cache holds only the validators, not a second copy of the page. '''
+    monkeypatch.setattr(page_reader, "cache", HttpCache(str(tmp_path / "cache")))
+    body = b"<html>page</html>" * 100
+    server.responses["/page"] = [(200, body, {"ETag": '"v1"'}), (304, b"")]
+    job = (f"{server.url}/page", str(tmp_path / "page"))
+    assert crawler.crawl([job], workers=1, compression="gzip") == []
+    path = find_page(job[1])
+    written = os.stat(path).st_mtime_ns
+    assert crawler.crawl([job], workers=1, refresh=True, compression="gzip") == []
+    assert server.headers[1].get("If-None-Match") == '"v1"'
+    assert os.stat(path).st_mtime_ns == written
+    assert read_page(job[1]) == body
+    assert sum(os.path.getsize(entry.path) for entry in os.scandir(tmp_path / "cache")) < 1000
+
+def test_changed_page_is_not_revalidated(server, tmp_path, monkeypatch):
+    ''' A page written again since its validators were stored is requested in full. '''
+    monkeypatch.setattr(page_reader, "cache", HttpCache(str(tmp_path / "cache")))
+    server.responses["/page"] = [(200, b"<html>first</html>", {"ETag": '"v1"'}), (200, b"<html>second</html>", {"ETag": '"v2"'})]
+    job = (f"{server.url}/page", str(tmp_path / "page"))
+    assert crawler.crawl([job], workers=1) == []
+    with open(job[1], 'ab') as out:
+        out.write(b"<!-- edited -->")
+    assert crawler.crawl([job], workers=1, refresh=True) == []
+    assert "If-None-Match" not in server.headers[1]
+    assert read_page(job[1]) == b"<html>second</html>"
@@ -0,0 +1,67 @@
+import pytest
+
+from gazetteer import Gazetteer, normalize_name, get_gazetteer
+
+@pytest.fixture(scope="module")
+def gazetteer() -> Gazetteer:
+    return get_gazetteer()
+
+@pytest.mark.parametrize("names, key", [
+    (["Prince George's County", "prince_georges_county", "Prince Georges County"], "princegeorgescounty"),
+    (["St. Louis City", "st_louis_city", "Saint Louis City", "ST LOUIS CITY"], "stlouiscity"),
+    (["Ste. Genevieve County", "Sainte Genevieve County", "ste_genevieve_county"], "stegenevievecounty"),
+    (["Doña Ana County", "Dona Ana County", "dona_ana_county"], "donaanacounty"),
+    (["Valdez-Cordova Census Area", "Valdez Cordova Census Area", "valdez_cordova_census_area"], "valdezcordovacensusarea"),
+    (["Richmond City", "Richmond Independent City", "richmond_city"], "richmondcity"),
+    (["New Mexico", "new_mexico", "NEW_MEXICO"], "newmexico"),
+])
+def test_normalize_name(names, key):
+    assert [normalize_name(name) for name in names] == [key] * len(names)
+
+@pytest.mark.parametrize("county, state, fips", [
+    ("St. Louis County", "Missouri", "29189"),
+    ("Saint Louis County", "missouri", "29189"),
+    ("st_louis_city", "missouri", "29510"),
+    ("Sainte Genevieve County", "Missouri", "29186"),
+    ("St. Clair County", "Illinois", "17163"),
+    ("Doña Ana County", "New Mexico", "35013"),
+    ("dona_ana_county", "new_mexico", "35013"),
+    ("Valdez-Cordova Census Area", "Alaska", "02261"),
+    ("Richmond Independent City", "Virginia", "51760"),
+    ("Richmond County", "Virginia", "51159"),
+])
+def test_county_fips(gazetteer, county, state, fips):
+    assert gazetteer.county_fips(county, state) == fips
+
+@pytest.mark.parametrize("county, state, fips", [
+    ("Doã±A Ana County", "New Mexico", "35013"), # Misread UTF-8 in older folder names
+    ("Chugach Census Area", "Alaska", "02261"), # Split from Valdez-Cordova, which the pages still report
+    ("copper_river_census_area", "alaska", "02261"),
+    ("Municipality Of Anchorage", "Alaska", "02020"),
+    ("Dade County", "Florida", "12086"),
+    ("Shannon County", "South Dakota", "46102"),
+])
+def test_aliases(gazetteer, county, state, fips):
+    assert gazetteer.county_fips(county, state) == fips
+
+def test_aliases_are_per_state(gazetteer):
+    ''' An alias in one state does not hide a county of the same name in another. '''
+    assert gazetteer.county_fips("Dade County", "Missouri") == "29057"
+
+def test_unknown_names(gazetteer):
+    assert gazetteer.county_fips("Nowhere County", "Missouri") is None
+    assert gazetteer.county_fips("St. Louis County", "Nowhere") is None
+    assert gazetteer.state_fips("Nowhere") is None
+
+def test_fuzzy_match(gazetteer):
+    ''' A misspelt name only matches when asked for a fuzzy match, and a distant one never does. '''
+    assert gazetteer.county_fips("St. Lous County", "Missouri") is None
+    assert gazetteer.county_fips("St. Lous County", "Missouri", fuzzy=True) == "29189"
+    assert gazetteer.county_fips("Zzyzx Parish", "Missouri", fuzzy=True) is None
+
+def test_names_and_states(gazetteer):
+    assert gazetteer.state_fips("new_mexico") == "35"
+    assert gazetteer.name("35013") == ("Doña Ana County", "New Mexico")
+    assert gazetteer.name("35") == ("", "New Mexico")
+    assert gazetteer.counties("Delaware") == ["10001", "10003", "10005"]
+    assert len(gazetteer.counties()) == 3142